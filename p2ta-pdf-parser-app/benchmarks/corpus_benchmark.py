@@ -0,0 +1,254 @@
+import os
+import re
+import sys
+import json
+import time
+import random
+import argparse
+import platform
+import resource
+import tempfile
+import subprocess
+import multiprocessing
+import importlib.util
+from concurrent.futures import ProcessPoolExecutor
+
+# Make the parser application's modules importable when run from anywhere
+APP_DIRECTORY = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, APP_DIRECTORY)
+
+import pymupdf  # noqa: E402
+import parsing_engine  # noqa: E402
+
+# Benchmark: end-to-end throughput of the ten parser scripts on a synthetic PDF corpus.
+# For every standard, deterministic contracts seeded with that standard's trigger phrases are
+# written with PyMuPDF, then each document goes through the parser's extract_text_from_pdf,
+# whitespace normalization and summarize_pdf_contents. The report (pages/s, MB/s, p50/p99
+# latency per document, peak RSS) is printed and saved as JSON to compare runs across commits.
+# Each standard runs in a fresh process, so its peak RSS is its own and not the highest seen so far.
+# With --profiles, every extraction profile is measured in turn; its match rate (the fraction of
+# steps found) and the documents whose summaries equal those of the default profile show what
+# the speed costs.
+
+FILLER_SENTENCES = [
+    "The company reported results for the period in line with prior year guidance.",
+    "Management believes that operations in each segment were consistent with expectations.",
+    "Amounts are presented in thousands of dollars unless otherwise noted.",
+    "The board of directors reviewed the quarterly statements at its regular meeting.",
+    "Certain prior period amounts have been reclassified to conform to the current presentation.",
+    "Operating expenses increased primarily due to higher personnel and facility costs.",
+]
+PAGE_RECT = pymupdf.Rect(54, 54, 558, 738)  # US Letter with 0.75 inch margins
+FONT_SIZE = 8
+GROUP = re.compile(r'\(([^()|]*)(?:\|[^()]*)?\)')
+
+def trigger_phrases(standard):
+    """One literal phrase per pattern of the standard, e.g. "contract with customer"."""
+    phrases = []
+    for step in parsing_engine.STANDARDS[standard]:
+        for pattern in step["patterns"]:
+            phrase = GROUP.sub(r'\1', pattern).replace('.*?', ' ')
+            phrase = re.sub(r'\s+', ' ', phrase).strip()
+            if not re.search(pattern, phrase, re.IGNORECASE):
+                raise ValueError(f"Synthetic phrase {phrase!r} does not match pattern {pattern!r}")
+            phrases.append(phrase)
+    return phrases
+
+def build_page_text(rng, phrases, chars_per_page, density):
+    """Filler sentences with a trigger phrase sentence in about `density` of them."""
+    sentences = []
+    size = 0
+    while size < chars_per_page:
+        if rng.random() < density:
+            sentence = f"The {rng.choice(phrases)} is described in note {rng.randint(1, 20)}."
+        else:
+            sentence = rng.choice(FILLER_SENTENCES)
+        sentences.append(sentence)
+        size += len(sentence) + 1
+    return " ".join(sentences)
+
+def write_document(path, standard, pages, chars_per_page, density, seed):
+    """Write a deterministic synthetic contract for a standard."""
+    rng = random.Random(f"{seed}-{standard}-{os.path.basename(path)}")
+    phrases = trigger_phrases(standard)
+    with pymupdf.open() as doc:
+        for _ in range(pages):
+            page = doc.new_page()
+            page.insert_textbox(PAGE_RECT, build_page_text(rng, phrases, chars_per_page, density), fontsize=FONT_SIZE)
+        doc.save(path, garbage=3, deflate=True)
+
+def build_corpus(corpus_directory, standards, page_counts, documents, chars_per_page, density, seed):
+    """Create (or reuse) the synthetic PDFs; return {standard: [(path, pages), ...]}."""
+    corpus = {}
+    for standard in standards:
+        folder = os.path.join(corpus_directory, standard)
+        os.makedirs(folder, exist_ok=True)
+        corpus[standard] = []
+        for pages in page_counts:
+            for index in range(documents):
+                name = f"{standard}-{pages}p-d{density}-c{chars_per_page}-s{seed}-{index}.pdf"
+                path = os.path.join(folder, name)
+                if not os.path.exists(path):
+                    write_document(path, standard, pages, chars_per_page, density, seed)
+                corpus[standard].append((path, pages))
+    return corpus
+
+def load_parser(standard):
+    """Import <standard>-pdf-parser.py, whose file name is not a valid module name."""
+    path = os.path.join(APP_DIRECTORY, f"{standard}-pdf-parser.py")
+    spec = importlib.util.spec_from_file_location(f"{standard}_pdf_parser", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+def percentile(values, fraction):
+    """Nearest-rank percentile of a non-empty list."""
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, round(fraction * len(ordered) + 0.5) - 1))]
+
+def peak_rss_mb():
+    """Peak resident set size of this process so far (ru_maxrss is in KiB on Linux, bytes on macOS)."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+def steps_found(summary):
+    """Number of steps of a summary with at least one match, and the number of steps."""
+    lines = summary.splitlines()
+    return sum(1 for line in lines if not line.endswith(": Not Found")), len(lines)
+
+def benchmark_in_process(standard, documents, repeat, profile="default"):
+    """benchmark_standard() in a new process (spawned, so it starts without the memory of earlier runs)."""
+    with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn")) as executor:
+        return executor.submit(benchmark_standard, standard, documents, repeat, profile).result()
+
+def benchmark_standard(standard, documents, repeat, profile="default"):
+    """Time every stage of the standard's parser on each document; also return each document's summary."""
+    parser = load_parser(standard)
+    stages = {"extract": 0.0, "normalize": 0.0, "summarize": 0.0}
+    latencies = []
+    summaries = []
+    pages = size = 0
+    for path, page_count in documents:
+        for _ in range(repeat):
+            start = time.perf_counter()
+            text = parser.extract_text_from_pdf(path, extraction_profile=profile)
+            extracted = time.perf_counter()
+            normalized = parsing_engine.normalize_text(text)
+            normalized_at = time.perf_counter()
+            summary = parser.summarize_pdf_contents(normalized)
+            finished = time.perf_counter()
+            stages["extract"] += extracted - start
+            stages["normalize"] += normalized_at - extracted
+            stages["summarize"] += finished - normalized_at
+            latencies.append(finished - start)
+            pages += page_count
+            size += os.path.getsize(path)
+        summaries.append(summary)
+    elapsed = sum(latencies)
+    found, steps = map(sum, zip(*(steps_found(summary) for summary in summaries)))
+    return {
+        "documents": len(latencies),
+        "pages": pages,
+        "megabytes": size / (1024 * 1024),
+        "seconds": elapsed,
+        "stage_seconds": stages,
+        "pages_per_second": pages / elapsed,
+        "megabytes_per_second": size / (1024 * 1024) / elapsed,
+        "latency_p50_seconds": percentile(latencies, 0.50),
+        "latency_p99_seconds": percentile(latencies, 0.99),
+        "match_rate": found / steps,
+        "peak_rss_mb": peak_rss_mb(),
+    }, summaries
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=APP_DIRECTORY, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def print_comparison(report, baseline_path):
+    """Print the pages/s of this run against a previous JSON report."""
+    with open(baseline_path, 'r', encoding='utf-8') as baseline_file:
+        baseline = json.load(baseline_file)
+    print(f"\nCompared with {baseline_path} (commit {baseline.get('commit')}):")
+    print(f"{'standard':<10} {'pages/s before':>15} {'pages/s now':>12} {'change':>8}")
+    for standard, result in report["standards"].items():
+        before = baseline.get("standards", {}).get(standard)
+        if before:
+            ratio = result["pages_per_second"] / before["pages_per_second"]
+            print(f"{standard:<10} {before['pages_per_second']:>15.1f} {result['pages_per_second']:>12.1f} {ratio:>7.2f}x")
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure parser throughput on a synthetic PDF corpus.")
+    parser.add_argument('--pages', default="5,50", help="Comma-separated page counts of the synthetic documents")
+    parser.add_argument('--documents', type=int, default=3, help="Documents per page count and standard")
+    parser.add_argument('--chars-per-page', type=int, default=3000, help="Characters per synthetic page")
+    parser.add_argument('--density', type=float, default=0.05, help="Fraction of sentences that carry a trigger phrase")
+    parser.add_argument('--repeat', type=int, default=1, help="Times each document is parsed")
+    parser.add_argument('--seed', type=int, default=606, help="Random seed for the synthetic text")
+    parser.add_argument('--standards', default=",".join(parsing_engine.STANDARDS),
+                        help="Comma-separated standards to benchmark (default: all)")
+    parser.add_argument('--profiles', default="default",
+                        help="Comma-separated extraction profiles to measure, e.g. default,fast,accurate (default: default)")
+    parser.add_argument('--corpus-dir', default=None,
+                        help="Keep the generated PDFs in this directory and reuse them (default: a temporary directory)")
+    parser.add_argument('--output', default="corpus_benchmark.json", help="Write the JSON report to this file")
+    parser.add_argument('--compare', default=None, help="Print the change in pages/s against an earlier JSON report")
+    args = parser.parse_args()
+
+    page_counts = [int(pages) for pages in args.pages.split(",")]
+    standards = args.standards.split(",")
+    profiles = args.profiles.split(",")
+    unknown = [profile for profile in profiles if profile not in parsing_engine.EXTRACTION_PROFILES]
+    if unknown:
+        parser.error(f"unknown extraction profile: {', '.join(unknown)}")
+    with tempfile.TemporaryDirectory() as temporary_directory:
+        corpus_directory = args.corpus_dir or temporary_directory
+        start = time.perf_counter()
+        corpus = build_corpus(corpus_directory, standards, page_counts, args.documents, args.chars_per_page,
+                              args.density, args.seed)
+        print(f"Synthetic corpus: {sum(len(documents) for documents in corpus.values())} PDFs "
+              f"({time.perf_counter() - start:.1f}s to build), page counts {page_counts}, density {args.density}")
+        results = {}
+        default_summaries = {}
+        for profile in profiles:
+            print(f"\nExtraction profile: {profile}")
+            print(f"{'standard':<10} {'pages/s':>9} {'MB/s':>7} {'p50 (s)':>9} {'p99 (s)':>9} "
+                  f"{'extract':>8} {'normalize':>10} {'summarize':>10} {'RSS (MB)':>9} {'match rate':>11} {'same':>6}")
+            results[profile] = {}
+            for standard in standards:
+                result, summaries = benchmark_in_process(standard, corpus[standard], args.repeat, profile)
+                if profile == "default":
+                    default_summaries[standard] = summaries
+                if standard in default_summaries:
+                    # Documents whose summary is identical to the one built from the default profile's text
+                    result["same_as_default"] = sum(summary == default for summary, default
+                                                    in zip(summaries, default_summaries[standard])) / len(summaries)
+                results[profile][standard] = result
+                stages = result["stage_seconds"]
+                same = f"{result['same_as_default']:.0%}" if "same_as_default" in result else "-"
+                print(f"{standard:<10} {result['pages_per_second']:>9.1f} {result['megabytes_per_second']:>7.2f} "
+                      f"{result['latency_p50_seconds']:>9.4f} {result['latency_p99_seconds']:>9.4f} "
+                      f"{stages['extract']:>8.3f} {stages['normalize']:>10.3f} {stages['summarize']:>10.3f} "
+                      f"{result['peak_rss_mb']:>9.1f} {result['match_rate']:>11.1%} {same:>6}")
+
+    report = {
+        "commit": git_commit(),
+        "timestamp": time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        "python": platform.python_version(),
+        "pymupdf": pymupdf.VersionBind,
+        "config": {key: value for key, value in vars(args).items() if key not in ("output", "compare", "corpus_dir")},
+        "standards": results[profiles[0]],
+        "profiles": results,
+        "peak_rss_mb": max(result["peak_rss_mb"] for profile_results in results.values()
+                           for result in profile_results.values()),
+    }
+    with open(args.output, 'w', encoding='utf-8') as output_file:
+        json.dump(report, output_file, indent=2)
+    print(f"Report written to {args.output}")
+    if args.compare:
+        print_comparison(report, args.compare)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,177 @@
+import os
+import sys
+import json
+import math
+import time
+import random
+import argparse
+
+# Make the parser application's modules importable when run from anywhere
+APP_DIRECTORY = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, APP_DIRECTORY)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import parsing_engine  # noqa: E402
+import corpus_benchmark  # noqa: E402
+
+# Profiler for the patterns in parsing_engine.STANDARDS.
+# Every pattern is run on its own (finditer, like summarize_per_pattern) over a corpus, either
+# synthetic text seeded with the standard's trigger phrases or the text of real PDFs, and its time
+# and match count are reported. Each pattern is then run on adversarial text made of many partial
+# matches that never complete (e.g. "contract with " repeated without "customer") at growing
+# sizes. The slope of log(time) against log(size) estimates how its cost grows; patterns above
+# --max-exponent are flagged as super-linear. Sizes stop growing once one run exceeds
+# --time-limit, so cubic patterns (three or more lazy gaps) cannot stall the profiler. With --check the script fails when a pattern is
+# flagged, so pattern edits can be verified before they ship.
+
+DEFAULT_SIZES = "25,50,100,200,400"
+DEFAULT_MAX_EXPONENT = 1.5  # linear patterns measure close to 1, quadratic ones close to 2
+DEFAULT_SLOW_FACTOR = 10  # flag patterns this many times slower than the median pattern
+DEFAULT_TIME_LIMIT = 0.2  # seconds; larger adversarial sizes are skipped once a run takes longer
+ADVERSARIAL_FILLER = "lorem ipsum dolor sit amet"  # shares no term with any pattern
+
+def literal_pieces(pattern):
+    """The example text of each part of the pattern between its unbounded gaps."""
+    pieces = []
+    for part in parsing_engine.UNBOUNDED_GAP.split(pattern):
+        piece = corpus_benchmark.GROUP.sub(r'\1', part).strip()
+        if piece:
+            pieces.append(piece)
+    return pieces
+
+def adversarial_text(pattern, repetitions):
+    """Many partial matches of the pattern that never complete.
+
+    Every piece but the last is repeated with filler in between, so each occurrence of the leading
+    literal starts a match attempt that has to search the rest of the text for the missing term.
+    A single literal is repeated without its last character.
+    """
+    pieces = literal_pieces(pattern)
+    partial = " ".join(pieces[:-1]) if len(pieces) > 1 else pieces[0][:-1]
+    return " ".join(f"{partial} {ADVERSARIAL_FILLER}" for _ in range(repetitions))
+
+def time_pattern(compiled, text, repeat):
+    """Best wall time of several finditer() runs and the number of matches."""
+    best = None
+    count = 0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        count = sum(1 for _ in compiled.finditer(text))
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, count
+
+def growth_exponent(sizes, times):
+    """Least-squares slope of log(time) against log(size)."""
+    points = [(math.log(size), math.log(max(seconds, 1e-9))) for size, seconds in zip(sizes, times)]
+    mean_x = sum(x for x, _ in points) / len(points)
+    mean_y = sum(y for _, y in points) / len(points)
+    numerator = sum((x - mean_x) * (y - mean_y) for x, y in points)
+    denominator = sum((x - mean_x) ** 2 for x, _ in points)
+    return numerator / denominator if denominator else 0.0
+
+def synthetic_corpus(standard, pages, chars_per_page, density, seed):
+    """Normalized synthetic text for a standard, as a list with one document."""
+    rng = random.Random(f"{seed}-{standard}")
+    phrases = corpus_benchmark.trigger_phrases(standard)
+    return [" ".join(corpus_benchmark.build_page_text(rng, phrases, chars_per_page, density) for _ in range(pages))]
+
+def pdf_corpus(corpus_directory):
+    """Normalized text of every PDF in the directory."""
+    texts = []
+    for name in sorted(os.listdir(corpus_directory)):
+        if name.endswith('.pdf'):
+            text = parsing_engine.normalize_text(parsing_engine.extract_text_from_pdf(os.path.join(corpus_directory, name)))
+            if text:
+                texts.append(text)
+    return texts
+
+def adversarial_times(compiled, source, sizes, repeat, time_limit):
+    """Times on adversarial input of growing size, stopping after the first run over time_limit."""
+    measured = {}
+    for size in sizes:
+        measured[size] = time_pattern(compiled, adversarial_text(source, size), repeat)[0]
+        if measured[size] > time_limit:
+            break
+    return measured
+
+def profile_standard(standard, texts, sizes, repeat, match_window, time_limit=DEFAULT_TIME_LIMIT):
+    """Time and growth exponent of every pattern of the standard."""
+    compiled_steps, _ = parsing_engine.get_compiled_standard(standard, match_window)
+    profiles = []
+    for (step_name, _, patterns), source_step in zip(compiled_steps, parsing_engine.STANDARDS[standard]):
+        for compiled, source in zip(patterns, source_step["patterns"]):
+            seconds = matches = 0
+            for text in texts:
+                elapsed, count = time_pattern(compiled, text, repeat)
+                seconds += elapsed
+                matches += count
+            measured = adversarial_times(compiled, source, sizes, repeat, time_limit)
+            profiles.append({
+                "standard": standard,
+                "step": step_name,
+                "pattern": compiled.pattern,
+                "seconds": seconds,
+                "matches": matches,
+                "adversarial_seconds": {str(size): seconds for size, seconds in measured.items()},
+                "growth_exponent": growth_exponent(list(measured), list(measured.values())),
+            })
+    return profiles
+
+def main():
+    parser = argparse.ArgumentParser(description="Profile every standard's patterns and flag slow or super-linear ones.")
+    parser.add_argument('--corpus-dir', default=None,
+                        help="Profile on the text of the PDFs in this directory (default: synthetic text per standard)")
+    parser.add_argument('--pages', type=int, default=50, help="Synthetic document length in pages")
+    parser.add_argument('--chars-per-page', type=int, default=3000, help="Characters per synthetic page")
+    parser.add_argument('--density', type=float, default=0.05, help="Fraction of synthetic sentences with a trigger phrase")
+    parser.add_argument('--seed', type=int, default=606, help="Random seed for the synthetic text")
+    parser.add_argument('--sizes', default=DEFAULT_SIZES,
+                        help=f"Comma-separated numbers of partial matches in the adversarial inputs (default: {DEFAULT_SIZES})")
+    parser.add_argument('--time-limit', type=float, default=DEFAULT_TIME_LIMIT,
+                        help=f"Skip larger adversarial sizes once a run takes longer than this many seconds (default: {DEFAULT_TIME_LIMIT})")
+    parser.add_argument('--repeat', type=int, default=3, help="Runs per measurement (best is reported)")
+    parser.add_argument('--match-window', type=parsing_engine.parse_match_window, default=None,
+                        help="Profile the window-bounded patterns used with this --match-window")
+    parser.add_argument('--standards', default=",".join(parsing_engine.STANDARDS),
+                        help="Comma-separated standards to profile (default: all)")
+    parser.add_argument('--max-exponent', type=float, default=DEFAULT_MAX_EXPONENT,
+                        help=f"Flag patterns whose cost grows faster than size**N on adversarial input (default: {DEFAULT_MAX_EXPONENT})")
+    parser.add_argument('--slow-factor', type=float, default=DEFAULT_SLOW_FACTOR,
+                        help=f"Flag patterns this many times slower than the median on the corpus (default: {DEFAULT_SLOW_FACTOR})")
+    parser.add_argument('--output', default=None, help="Also write the profile as JSON to this file")
+    parser.add_argument('--check', action='store_true', help="Exit with an error if any pattern is flagged")
+    args = parser.parse_args()
+
+    sizes = [int(size) for size in args.sizes.split(",")]
+    profiles = []
+    texts = pdf_corpus(args.corpus_dir) if args.corpus_dir else None
+    for standard in args.standards.split(","):
+        if not args.corpus_dir:
+            texts = synthetic_corpus(standard, args.pages, args.chars_per_page, args.density, args.seed)
+        profiles.extend(profile_standard(standard, texts, sizes, args.repeat, args.match_window, args.time_limit))
+
+    median = sorted(profile["seconds"] for profile in profiles)[len(profiles) // 2]
+    for profile in profiles:
+        profile["flags"] = []
+        if profile["growth_exponent"] > args.max_exponent:
+            profile["flags"].append("super-linear")
+        if median and profile["seconds"] > args.slow_factor * median:
+            profile["flags"].append("slow")
+
+    print(f"Window: {args.match_window or 'unbounded'}, adversarial sizes {sizes}")
+    print(f"{'standard':<8} {'pattern':<45} {'time (ms)':>10} {'matches':>8} {'exponent':>9}  flags")
+    for profile in sorted(profiles, key=lambda profile: profile["seconds"], reverse=True):
+        print(f"{profile['standard']:<8} {profile['pattern'][:45]:<45} {profile['seconds'] * 1000:>10.3f} "
+              f"{profile['matches']:>8} {profile['growth_exponent']:>9.2f}  {', '.join(profile['flags'])}")
+
+    flagged = [profile for profile in profiles if profile["flags"]]
+    print(f"{len(flagged)} of {len(profiles)} patterns flagged")
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as output_file:
+            json.dump({"match_window": args.match_window, "sizes": sizes, "patterns": profiles}, output_file, indent=2)
+    if args.check and flagged:
+        sys.exit(f"{len(flagged)} patterns are slow or grow super-linearly")
+
+if __name__ == "__main__":
+    main()
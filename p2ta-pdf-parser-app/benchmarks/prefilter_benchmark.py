@@ -0,0 +1,91 @@
+import os
+import sys
+import json
+import time
+import random
+import argparse
+
+# Make the parser application's modules importable when run from anywhere
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import metrics  # noqa: E402
+import parsing_engine  # noqa: E402
+import corpus_benchmark  # noqa: E402
+
+# Benchmark: the literal page prefilter of parsing_engine.scan_range.
+# Synthetic filings are built page by page, with the standard's trigger phrases on only a fraction
+# of the pages (like the few note pages of a 10-K that discuss one topic). The pages are normalized
+# once, then matched page by page with the prefilter and without it (a copy of the scanner with no
+# prefilter literals), so the times are those of the matcher alone. The report gives the fraction of pages skipped, both matching times, and whether the
+# summaries are identical to each other and to the per-pattern reference (summarize_per_pattern).
+
+def build_pages(standard, pages, chars_per_page, anchor_fraction, density, seed):
+    """Page texts where about anchor_fraction of the pages carry trigger phrases."""
+    rng = random.Random(f"{seed}-{standard}")
+    phrases = corpus_benchmark.trigger_phrases(standard)
+    return [corpus_benchmark.build_page_text(rng, phrases, chars_per_page, density if rng.random() < anchor_fraction else 0)
+            for _ in range(pages)]
+
+def time_summary(chunks, standard, match_window, scanner, repeat):
+    """Best time of several summaries of the chunks with the given scanner, the summary and the chunks skipped."""
+    compiled_steps, _ = parsing_engine.get_compiled_standard(standard, match_window)
+    best = None
+    for _ in range(repeat):
+        document_metrics = metrics.DocumentMetrics(standard, "benchmark")
+        started = time.perf_counter()
+        pattern_matches, _ = parsing_engine.scan_chunks(iter(chunks), scanner, document_metrics)
+        summary = parsing_engine.format_summary(compiled_steps, scanner, pattern_matches)
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best, summary, document_metrics.skipped_chunks
+
+def benchmark_standard(standard, pages, match_window, repeat):
+    _, scanner = parsing_engine.get_compiled_standard(standard, match_window)
+    without_prefilter = dict(scanner, prefilter=[])
+    chunks = list(parsing_engine.normalize_pages(pages))
+    seconds, summary, skipped = time_summary(chunks, standard, match_window, scanner, repeat)
+    baseline_seconds, baseline_summary, _ = time_summary(chunks, standard, match_window, without_prefilter, repeat)
+    reference = parsing_engine.summarize_per_pattern(parsing_engine.normalize_text("".join(pages)), standard, match_window)
+    return {
+        "pages": len(pages),
+        "skipped_pages": skipped,
+        "skipped_fraction": skipped / len(pages),
+        "seconds": seconds,
+        "seconds_without_prefilter": baseline_seconds,
+        "speedup": baseline_seconds / seconds if seconds else None,
+        "identical": summary == baseline_summary == reference,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure the pages skipped by the literal prefilter and the time saved.")
+    parser.add_argument('--pages', type=int, default=300, help="Pages per synthetic filing")
+    parser.add_argument('--chars-per-page', type=int, default=3000, help="Characters per page")
+    parser.add_argument('--anchor-fraction', type=float, default=0.1, help="Fraction of pages with trigger phrases")
+    parser.add_argument('--density', type=float, default=0.1, help="Fraction of sentences with a trigger phrase on those pages")
+    parser.add_argument('--match-window', type=lambda value: None if value == "none" else parsing_engine.parse_match_window(value),
+                        default="sentence", help="Match window to benchmark (default: sentence; 'none' for unbounded patterns)")
+    parser.add_argument('--repeat', type=int, default=3, help="Runs per measurement (best is reported)")
+    parser.add_argument('--seed', type=int, default=606, help="Random seed for the synthetic text")
+    parser.add_argument('--standards', default=",".join(parsing_engine.STANDARDS),
+                        help="Comma-separated standards to benchmark (default: all)")
+    parser.add_argument('--output', default=None, help="Also write the report as JSON to this file")
+    args = parser.parse_args()
+
+    match_window = args.match_window
+    print(f"{args.pages} pages, {args.anchor_fraction:.0%} with trigger phrases, window: {match_window or 'unbounded'}")
+    print(f"{'standard':<10} {'skipped':>8} {'time (ms)':>10} {'without (ms)':>13} {'speedup':>8} {'identical':>10}")
+    results = {}
+    for standard in args.standards.split(","):
+        pages = build_pages(standard, args.pages, args.chars_per_page, args.anchor_fraction, args.density, args.seed)
+        result = results[standard] = benchmark_standard(standard, pages, match_window, args.repeat)
+        print(f"{standard:<10} {result['skipped_fraction']:>8.1%} {result['seconds'] * 1000:>10.2f} "
+              f"{result['seconds_without_prefilter'] * 1000:>13.2f} {result['speedup']:>7.2f}x {str(result['identical']):>10}")
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as output_file:
+            json.dump({"config": vars(args), "standards": results}, output_file, indent=2)
+    if not all(result["identical"] for result in results.values()):
+        sys.exit("Summaries differ with the prefilter")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+import os
+import sys
+import time
+import random
+import argparse
+
+# Make the parser application's modules importable when run from anywhere
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import parsing_engine  # noqa: E402
+
+# Benchmark: single-pass scanner (parsing_engine.summarize) against the per-pattern
+# finditer loop (parsing_engine.summarize_per_pattern) on synthetic normalized text.
+
+FILLER_WORDS = (
+    "the company reported results for the period and management believes that its "
+    "operations in each segment were consistent with prior year guidance as described"
+).split()
+
+def trigger_phrases():
+    """Collect the literal words of every standard's patterns to seed the synthetic text."""
+    phrases = set()
+    for steps in parsing_engine.STANDARDS.values():
+        for step in steps:
+            for pattern in step["patterns"]:
+                for part in pattern.replace('(', '|').replace(')', '|').split('|'):
+                    phrases.update(piece.strip() for piece in part.split('.*?') if piece.strip())
+    return sorted(phrases)
+
+def build_text(pages, chars_per_page, density, seed):
+    """Build deterministic, already-normalized text of roughly pages * chars_per_page characters."""
+    rng = random.Random(seed)
+    phrases = trigger_phrases()
+    words = []
+    size = 0
+    target = pages * chars_per_page
+    while size < target:
+        word = rng.choice(phrases) if rng.random() < density else rng.choice(FILLER_WORDS)
+        words.append(word)
+        size += len(word) + 1
+    return " ".join(words)
+
+def time_call(function, text, standard, repeat):
+    """Return the best wall time of several runs and the result of the last one."""
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function(text, standard)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the single-pass scanner with the per-pattern loop.")
+    parser.add_argument('--pages', type=int, default=300, help="Synthetic document length in pages")
+    parser.add_argument('--chars-per-page', type=int, default=3000, help="Characters per synthetic page")
+    parser.add_argument('--density', type=float, default=0.02, help="Fraction of words that are trigger phrases")
+    parser.add_argument('--repeat', type=int, default=3, help="Runs per measurement (best is reported)")
+    parser.add_argument('--seed', type=int, default=606, help="Random seed for the synthetic text")
+    args = parser.parse_args()
+
+    text = build_text(args.pages, args.chars_per_page, args.density, args.seed)
+    print(f"Synthetic document: {args.pages} pages, {len(text):,} characters, trigger density {args.density}")
+    print(f"{'standard':<10} {'per-pattern (s)':>16} {'single-pass (s)':>16} {'speedup':>8}  identical")
+
+    total_loop = total_scan = 0.0
+    all_identical = True
+    for standard in parsing_engine.STANDARDS:
+        loop_time, loop_summary = time_call(parsing_engine.summarize_per_pattern, text, standard, args.repeat)
+        scan_time, scan_summary = time_call(parsing_engine.summarize, text, standard, args.repeat)
+        identical = loop_summary == scan_summary
+        all_identical = all_identical and identical
+        total_loop += loop_time
+        total_scan += scan_time
+        print(f"{standard:<10} {loop_time:>16.4f} {scan_time:>16.4f} {loop_time / scan_time:>7.1f}x  {identical}")
+
+    print(f"{'total':<10} {total_loop:>16.4f} {total_scan:>16.4f} {total_loop / total_scan:>7.1f}x  {all_identical}")
+    if not all_identical:
+        sys.exit("Single-pass scanner output differs from the per-pattern loop")
+
+if __name__ == "__main__":
+    main()
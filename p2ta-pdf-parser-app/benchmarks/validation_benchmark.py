@@ -0,0 +1,105 @@
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+
+# Make the parser application's modules importable when run from anywhere
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import pdf_validation  # noqa: E402
+import corpus_benchmark  # noqa: E402
+
+try:
+    import PyPDF2  # only for the previous check; the website no longer depends on it
+except ImportError:
+    PyPDF2 = None
+
+# Benchmark: upload validation, the website's previous PyPDF2 check (a full PdfReader and its page
+# count) against pdf_validation.open_checked (header and trailer bytes, then PyMuPDF's encryption
+# flag and page count). Large synthetic filings are generated with PyMuPDF, each in three variants:
+# intact, with a wrong startxref offset (the cross-reference table has to be rebuilt) and truncated
+# (the end of the file is missing). The report gives the time of both checks and their verdicts.
+
+VARIANTS = ("intact", "bad-xref", "truncated")
+
+def write_variants(corpus_directory, pages, chars_per_page, seed):
+    """Create (or reuse) the three variants of a synthetic filing; return {variant: path}."""
+    intact = os.path.join(corpus_directory, f"filing-{pages}.pdf")
+    if not os.path.exists(intact):
+        corpus_benchmark.write_document(intact, "asc606", pages, chars_per_page, 0.1, seed)
+    with open(intact, 'rb') as pdf_file:
+        data = pdf_file.read()
+    paths = {"intact": intact}
+    offset = data.rindex(b"startxref") + len(b"startxref")
+    damaged = {"bad-xref": data[:offset] + b"\n1\n%%EOF\n", "truncated": data[:int(len(data) * 0.9)]}
+    for variant, variant_data in damaged.items():
+        paths[variant] = os.path.join(corpus_directory, f"filing-{pages}-{variant}.pdf")
+        with open(paths[variant], 'wb') as pdf_file:
+            pdf_file.write(variant_data)
+    return paths
+
+def pypdf2_check(pdf_path):
+    """The website's previous is_valid_pdf()."""
+    try:
+        with open(pdf_path, 'rb') as file:
+            pdf_reader = PyPDF2.PdfReader(file)
+            return len(pdf_reader.pages) > 0
+    except (PyPDF2.errors.PdfReadError, FileNotFoundError, IsADirectoryError):
+        return False
+
+def structural_check(pdf_path):
+    doc, _ = pdf_validation.open_checked(pdf_path)
+    if doc is None:
+        return False
+    doc.close()
+    return True
+
+def time_check(check, pdf_path, repeat):
+    """Best time of several runs of a check, and its verdict."""
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        valid = check(pdf_path)
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best, valid
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the PyPDF2 validity check with the structural pre-check.")
+    parser.add_argument('--pages', default="500,2000", help="Comma-separated page counts of the synthetic filings")
+    parser.add_argument('--chars-per-page', type=int, default=1500, help="Characters per page")
+    parser.add_argument('--repeat', type=int, default=3, help="Runs per measurement (best is reported)")
+    parser.add_argument('--seed', type=int, default=606, help="Random seed for the synthetic text")
+    parser.add_argument('--corpus-dir', default=None, help="Keep the generated PDFs here and reuse them (default: a temporary folder)")
+    parser.add_argument('--output', default=None, help="Also write the report as JSON to this file")
+    args = parser.parse_args()
+
+    if PyPDF2 is None:
+        print("PyPDF2 is not installed: only the structural pre-check is timed (pip install PyPDF2 to compare)")
+    with tempfile.TemporaryDirectory() as temporary_directory:
+        corpus_directory = args.corpus_dir or temporary_directory
+        os.makedirs(corpus_directory, exist_ok=True)
+        print(f"{'pages':>6} {'variant':<10} {'MB':>6} {'PyPDF2 (ms)':>12} {'pre-check (ms)':>15} {'speedup':>8} {'verdicts':>16}")
+        results = []
+        for pages in (int(value) for value in args.pages.split(",")):
+            for variant, pdf_path in write_variants(corpus_directory, pages, args.chars_per_page, args.seed).items():
+                result = {"pages": pages, "variant": variant, "bytes": os.path.getsize(pdf_path)}
+                result["seconds"], result["valid"] = time_check(structural_check, pdf_path, args.repeat)
+                if PyPDF2 is not None:
+                    result["seconds_pypdf2"], result["valid_pypdf2"] = time_check(pypdf2_check, pdf_path, args.repeat)
+                    result["speedup"] = result["seconds_pypdf2"] / result["seconds"] if result["seconds"] else None
+                results.append(result)
+                previous = (f"{result['seconds_pypdf2'] * 1000:>12.2f}" if PyPDF2 is not None else f"{'-':>12}")
+                speedup = f"{result['speedup']:>7.1f}x" if result.get("speedup") else f"{'-':>8}"
+                verdicts = f"{result.get('valid_pypdf2', '-')}/{result['valid']}"
+                print(f"{pages:>6} {variant:<10} {result['bytes'] / 1e6:>6.1f} {previous} "
+                      f"{result['seconds'] * 1000:>15.2f} {speedup} {verdicts:>16}")
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as output_file:
+            json.dump({"config": vars(args), "results": results}, output_file, indent=2)
+
+if __name__ == "__main__":
+    main()
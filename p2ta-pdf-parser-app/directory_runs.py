@@ -0,0 +1,448 @@
+import os
+import logging
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import parsing_engine  # Extraction and matching of single PDFs
+import text_store  # Persistent store of extracted text for re-matching
+import file_manifest  # Files parsed by earlier directory runs
+import metrics  # Per-document stage timers and counters
+import jsonl_output  # Structured one-line-per-document output
+
+# Runs over folders of PDFs, built on parsing_engine: which files of a folder to parse (compared
+# with the manifest of earlier runs), where their summaries and JSONL records go, what the
+# manifest records afterwards, and rescans of the text store. parsing_engine itself only
+# extracts and matches the documents it is given.
+
+def record_writer(records, standard):
+    """on_result callback appending each document's JSONL record as soon as it is parsed; workers only return it."""
+    if isinstance(standard, list):
+        writers = {name: record_writer(records, name) for name in standard}
+
+        def write_records(pdf_file, results):
+            for name, result in results.items():
+                writers[name](pdf_file, result)
+        return write_records
+
+    def write_record(pdf_file, result):
+        record = result.pop("record", None) or {"pdf": pdf_file, "standard": standard, "status": result["status"],
+                                                 "error": result["error"]}
+        records.write(record)
+        if result["status"] == "success":
+            result["output"] = records.path
+    return write_record
+
+def list_pdfs(pdf_directory):
+    """Names of the PDFs in a folder, and their paths largest first."""
+    pdf_files = [f for f in os.listdir(pdf_directory) if f.endswith('.pdf')]
+    pdf_paths = (os.path.join(pdf_directory, f) for f in pdf_files)
+    return pdf_files, sorted(pdf_paths, key=parsing_engine.file_size, reverse=True)
+
+def remove_deleted(pdf_files, previous_entries, standard, records=None):
+    """Remove the summaries of PDFs that are gone since the previous run (or write their JSONL tombstones).
+
+    Returns the names of those PDFs, to drop from the manifest.
+    """
+    deleted = sorted(set(previous_entries) - set(pdf_files))
+    for pdf_file in deleted:
+        if records:
+            records.write({"pdf": pdf_file, "standard": standard, "status": "deleted"})
+        else:
+            file_manifest.remove_output(pdf_file, previous_entries[pdf_file])
+    return deleted
+
+def compare_with_manifest(pdf_paths, previous_entries, full=False, fingerprints=None):
+    """Return (new manifest entries, "unchanged" results, paths to parse) for a folder.
+
+    fingerprints can carry the fingerprints already taken of the same files for another standard.
+    """
+    entries = {}
+    results = {}
+    pending = []
+    for pdf_path in pdf_paths:
+        pdf_file = os.path.basename(pdf_path)
+        previous = previous_entries.get(pdf_file)
+        try:
+            if fingerprints is not None and pdf_path in fingerprints:
+                entries[pdf_file] = dict(fingerprints[pdf_path])
+            else:
+                entries[pdf_file] = file_manifest.fingerprint(pdf_path, previous)
+                if fingerprints is not None:
+                    fingerprints[pdf_path] = dict(entries[pdf_file])
+        except OSError:
+            pending.append(pdf_path)  # parsing_engine.process_pdf() reports the error
+            continue
+        if not full and file_manifest.is_unchanged(entries[pdf_file], previous):
+            for key in ("output", "output_mtime_ns", "format"):
+                if key in previous:
+                    entries[pdf_file][key] = previous[key]
+            results[pdf_file] = {"status": "unchanged", "output": previous["output"], "error": None}
+        else:
+            pending.append(pdf_path)
+    return entries, results, pending
+
+def update_manifest(manifest_file, variant, entries, results, jsonl=False, deleted=()):
+    """Record what was parsed; failed files stay out of the manifest so the next run retries them.
+
+    The manifest is read again under its lock and only the entries of this run's files (and of the
+    deleted ones) change, so entries that another process recorded meanwhile (e.g. the website's
+    uploads while the watch daemon parses the folder) are kept.
+    """
+    failed = set(deleted)
+    for pdf_file, result in results.items():
+        if result["status"] == "success" and pdf_file in entries and jsonl:
+            entries[pdf_file]["output"] = result["output"]
+            entries[pdf_file]["format"] = "jsonl"
+        elif result["status"] == "success" and pdf_file in entries:
+            entries[pdf_file]["output"] = result["output"]
+            entries[pdf_file]["output_mtime_ns"] = os.stat(result["output"]).st_mtime_ns
+        elif result["status"] != "unchanged":
+            entries.pop(pdf_file, None)
+            failed.add(pdf_file)
+    with file_manifest.locked(manifest_file):
+        current = file_manifest.load_manifest(manifest_file, variant, quiet=True)
+        for pdf_file in failed:
+            current.pop(pdf_file, None)
+        current.update(entries)
+        file_manifest.save_manifest(manifest_file, variant, current)
+
+def process_directory(standard, pdf_directory=None, output_directory="output_files", full=False,
+                      jsonl_per_run=False, jsonl_rotate_mb=jsonl_output.DEFAULT_ROTATE_MB, **options):
+    """Parse the new or changed PDFs in the standard's folder; return a status dict per file.
+
+    Summaries are written to output_directory/<standard>/ (see
+    parsing_engine.standard_output_directory()). A manifest of the files parsed by earlier runs is
+    kept next to them: unchanged
+    files are reported as "unchanged" without being parsed, and the summaries of PDFs that were
+    deleted are removed. full=True reparses every file. Other keyword options (workers,
+    split_pages, executor, match_window, cache_dir, ...) are passed on to parsing_engine.parse_files().
+
+    With output_format="jsonl" each parsed file's record is appended to the results file as soon
+    as it finishes (see jsonl_output), and deleted PDFs get a {"status": "deleted"} line instead.
+    """
+    if pdf_directory is None:
+        pdf_directory = os.path.join("pdf_files_to_parse", standard)
+
+    # Check for existence
+    if not os.path.exists(pdf_directory):
+        logging.error(f"Directory not found: {pdf_directory}")
+        return {}
+
+    # Create output directory if it doesn't exist
+    output_format = options.get("output_format", "txt")
+    standard_output = parsing_engine.standard_output_directory(output_directory, standard, output_format)
+    os.makedirs(standard_output, exist_ok=True)
+    pdf_files, pdf_paths = list_pdfs(pdf_directory)
+
+    # Compare the folder with the manifest of the previous run
+    records = jsonl_output.open_writer(output_directory, jsonl_per_run, jsonl_rotate_mb) if output_format == "jsonl" else None
+    manifest_file = file_manifest.manifest_path(standard_output, standard, pdf_directory)
+    variant = parsing_engine.summary_variant(standard, options.get("match_window"), output_format,
+                                             options.get("max_matches_per_step"),
+                                             parsing_engine.profile_for(standard, options.get("extraction_profile")))
+    previous_entries = file_manifest.load_manifest(manifest_file, variant)
+    deleted = remove_deleted(pdf_files, previous_entries, standard, records)
+    entries, results, pending = compare_with_manifest(pdf_paths, previous_entries, full)
+
+    if not pdf_files:
+        logging.error(f"No PDF files found in directory: {pdf_directory}")
+    elif results:
+        logging.info(f"Skipping {len(results)} unchanged PDF files, parsing {len(pending)} new or changed")
+    results.update(parsing_engine.parse_files(pending, standard, standard_output,
+                                              on_result=record_writer(records, standard) if records else None,
+                                              **options))
+
+    update_manifest(manifest_file, variant, entries, results, records is not None, deleted)
+    if options.get("metrics_dir"):
+        metrics.record_results(options["metrics_dir"], results)
+    return results
+
+def analyze_directory(standards, pdf_directory, output_directory="output_files", full=False,
+                      jsonl_per_run=False, jsonl_rotate_mb=jsonl_output.DEFAULT_ROTATE_MB, **options):
+    """Parse the PDFs of one folder against several standards; return {standard: {file: status dict}}.
+
+    Each new or changed PDF is extracted once for all the standards (see parsing_engine.process_pdf_standards()).
+    Every standard keeps its summaries and manifest in output_directory/<standard>/, so each one
+    behaves like process_directory() run over the folder on its own; a PDF that changed for
+    any standard is parsed again for all of them.
+    """
+    if not os.path.exists(pdf_directory):
+        logging.error(f"Directory not found: {pdf_directory}")
+        return {}
+    os.makedirs(output_directory, exist_ok=True)
+    pdf_files, pdf_paths = list_pdfs(pdf_directory)
+
+    output_format = options.get("output_format", "txt")
+    records = jsonl_output.open_writer(output_directory, jsonl_per_run, jsonl_rotate_mb) if output_format == "jsonl" else None
+    manifests = {}
+    results = {}
+    pending = set()
+    fingerprints = {}
+    for standard in standards:
+        standard_output = parsing_engine.standard_output_directory(output_directory, standard, output_format)
+        os.makedirs(standard_output, exist_ok=True)
+        manifest_file = file_manifest.manifest_path(standard_output, standard, pdf_directory)
+        variant = parsing_engine.summary_variant(standard, options.get("match_window"), output_format,
+                                                 options.get("max_matches_per_step"),
+                                                 parsing_engine.profile_for(standards, options.get("extraction_profile")))
+        previous_entries = file_manifest.load_manifest(manifest_file, variant)
+        deleted = remove_deleted(pdf_files, previous_entries, standard, records)
+        entries, results[standard], standard_pending = compare_with_manifest(pdf_paths, previous_entries, full,
+                                                                             fingerprints)
+        manifests[standard] = (manifest_file, variant, entries, deleted)
+        pending.update(standard_pending)
+
+    pending = [pdf_path for pdf_path in pdf_paths if pdf_path in pending]  # keep the largest-first order
+    if not pdf_files:
+        logging.error(f"No PDF files found in directory: {pdf_directory}")
+    elif len(pending) < len(pdf_paths):
+        logging.info(f"Skipping {len(pdf_paths) - len(pending)} unchanged PDF files, parsing {len(pending)} new or changed")
+    parsed = parsing_engine.parse_files(pending, standards, output_directory,
+                                        on_result=record_writer(records, standards) if records else None, **options)
+    for pdf_file, standard_results in parsed.items():
+        for standard, result in standard_results.items():
+            results[standard][pdf_file] = result
+
+    for standard in standards:
+        manifest_file, variant, entries, deleted = manifests[standard]
+        update_manifest(manifest_file, variant, entries, results[standard], records is not None, deleted)
+        if options.get("metrics_dir"):
+            metrics.record_results(options["metrics_dir"], results[standard])
+    return results
+
+def process_files(standard, pdf_paths, output_directory="output_files", pdf_directory=None, full=False,
+                  jsonl_per_run=False, jsonl_rotate_mb=jsonl_output.DEFAULT_ROTATE_MB, digests=None, move_parsed=None,
+                  **options):
+    """Parse only the given PDFs (e.g. one website upload) instead of a whole folder; return a status dict per file.
+
+    The files are parsed whether they changed or not (full is accepted for symmetry with
+    process_directory()). Those in pdf_directory (default: the standard's folder, or
+    pdf_files_to_parse/multi for a list of standards) are added to its manifest, so the next
+    folder run does not parse them again; digests can map paths to their known SHA-256, so those
+    files are not read again to fingerprint them. Outputs are written as by process_directory(), or
+    by analyze_directory() for a list of standards.
+
+    move_parsed can map the files, parsed where they are (e.g. uploads in a staging folder), to
+    the names they should get in pdf_directory: each one that parsed successfully is moved there
+    once it is in the manifest, so a watch daemon over that folder finds it already parsed. A name
+    that is taken gets a number (see free_name()).
+    """
+    standards = standard if isinstance(standard, list) else [standard]
+    if pdf_directory is None:
+        pdf_directory = os.path.join("pdf_files_to_parse", "multi" if isinstance(standard, list) else standard)
+    output_format = options.get("output_format", "txt")
+    os.makedirs(output_directory, exist_ok=True)
+    parse_output = output_directory
+    if not isinstance(standard, list):
+        parse_output = parsing_engine.standard_output_directory(output_directory, standard, output_format)
+        os.makedirs(parse_output, exist_ok=True)
+    records = jsonl_output.open_writer(output_directory, jsonl_per_run, jsonl_rotate_mb) if output_format == "jsonl" else None
+    results = parsing_engine.parse_files(pdf_paths, standard, parse_output,
+                                         on_result=record_writer(records, standard) if records else None, **options)
+
+    def record(paths, names=None):
+        for name in standards:
+            if isinstance(standard, list):
+                standard_results = {pdf_file: result[name] for pdf_file, result in results.items()}
+            else:
+                standard_results = results
+            variant = parsing_engine.summary_variant(name, options.get("match_window"), output_format,
+                                                     options.get("max_matches_per_step"),
+                                                     parsing_engine.profile_for(standard, options.get("extraction_profile")))
+            standard_output = parsing_engine.standard_output_directory(output_directory, name, output_format)
+            manifest_file = file_manifest.manifest_path(standard_output, name, pdf_directory)
+            record_in_manifest(manifest_file, variant, paths, standard_results, records is not None, digests, names)
+            if options.get("metrics_dir"):
+                metrics.record_results(options["metrics_dir"], standard_results)
+
+    if not move_parsed:
+        record([pdf_path for pdf_path in pdf_paths
+                if os.path.dirname(os.path.abspath(pdf_path)) == os.path.abspath(pdf_directory)])
+        return results
+    os.makedirs(pdf_directory, exist_ok=True)
+    parsed = []
+    for pdf_path in pdf_paths:
+        result = results[os.path.basename(pdf_path)]
+        statuses = [result[name]["status"] for name in standards] if isinstance(standard, list) else [result["status"]]
+        if all(status == "success" for status in statuses):
+            parsed.append(pdf_path)
+    # Names are chosen, recorded and taken under a lock, so two uploads of the same name both keep their file
+    with file_manifest.locked(os.path.join(pdf_directory, MOVE_LOCK)):
+        names = {}
+        for pdf_path in parsed:
+            names[pdf_path] = free_name(pdf_directory, move_parsed.get(pdf_path, os.path.basename(pdf_path)),
+                                        taken=set(names.values()))
+        record(parsed, names)
+        for pdf_path in parsed:
+            os.replace(pdf_path, os.path.join(pdf_directory, names[pdf_path]))
+    return results
+
+MOVE_LOCK = ".p2ta-moving"  # locked (as .p2ta-moving.lock) while process_files() moves files into a folder
+
+def free_name(folder, pdf_file, taken=()):
+    """pdf_file, or pdf_file with the first number (name-1.pdf, name-2.pdf, ...) that no file in folder has yet."""
+    stem, extension = os.path.splitext(pdf_file)
+    candidate = pdf_file
+    number = 0
+    while candidate in taken or os.path.exists(os.path.join(folder, candidate)):
+        number += 1
+        candidate = f"{stem}-{number}{extension}"
+    return candidate
+
+def record_in_manifest(manifest_file, variant, pdf_paths, results, jsonl=False, digests=None, names=None):
+    """Add the results of some files of a folder to its manifest, keeping the entries of the other files.
+
+    names can map paths to the names the files are recorded under, when they are about to be
+    moved into the folder under another name.
+    """
+    previous_entries = file_manifest.load_manifest(manifest_file, variant, quiet=True)
+    entries = {}
+    parsed = {}
+    for pdf_path in pdf_paths:
+        pdf_file = (names or {}).get(pdf_path, os.path.basename(pdf_path))
+        try:
+            entries[pdf_file] = file_manifest.fingerprint(pdf_path, previous_entries.get(pdf_file),
+                                                          (digests or {}).get(pdf_path))
+        except OSError:
+            parsed[pdf_file] = {"status": "failed", "output": None, "error": "File not found"}
+            continue
+        parsed[pdf_file] = results[os.path.basename(pdf_path)]
+    update_manifest(manifest_file, variant, entries, parsed, jsonl)
+
+def rescan_document(store_directory, document, pdf_path, standard, output_directory, **options):
+    """Worker task: match one stored document without opening its PDF."""
+    page_texts = text_store.open_store(store_directory).read_pages(document)
+    parse = parsing_engine.process_pdf_standards if isinstance(standard, list) else parsing_engine.process_pdf
+    return parse(pdf_path, standard, output_directory, page_texts=page_texts, **options)
+
+def rescan_store(standard, output_directory="output_files", text_store_dir=None, workers=None, executor=None,
+                 match_window=None, metrics_dir=None, output_format="txt", jsonl_per_run=False,
+                 jsonl_rotate_mb=jsonl_output.DEFAULT_ROTATE_MB, max_matches_per_step=None, **pdf_options):
+    """Match a standard against every document in the text store; return a status dict per PDF.
+
+    Outputs are written as by process_directory(), or by analyze_directory() for a list of standards.
+    Options that only apply to PDFs (split_pages, cache_dir, full, ...) are ignored. standard can
+    also be a list, as for parsing_engine.parse_files(): each document is then read once and its
+    result is a status dict per standard.
+    """
+    if not text_store_dir:
+        logging.error("--rescan needs a --text-store-dir")
+        return {}
+    documents = text_store.open_store(text_store_dir).documents()
+    if not documents:
+        logging.error(f"No documents found in text store: {text_store_dir}")
+        return {}
+    os.makedirs(output_directory, exist_ok=True)
+    records = jsonl_output.open_writer(output_directory, jsonl_per_run, jsonl_rotate_mb) if output_format == "jsonl" else None
+    on_result = record_writer(records, standard) if records else None
+    if not isinstance(standard, list):
+        output_directory = parsing_engine.standard_output_directory(output_directory, standard, output_format)
+        os.makedirs(output_directory, exist_ok=True)
+    options = {"match_window": match_window, "metrics_dir": metrics_dir, "output_format": output_format,
+               "max_matches_per_step": max_matches_per_step}
+    logging.info(f"Rescanning {len(documents)} stored documents for {standard}")
+
+    results = {}
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 and executor is None:
+        for pdf_path, document in documents.items():
+            pdf_file = os.path.basename(pdf_path)
+            results[pdf_file] = rescan_document(text_store_dir, document, pdf_path, standard, output_directory, **options)
+            if on_result:
+                on_result(pdf_file, results[pdf_file])
+    else:
+        own_executor = executor is None
+        if own_executor:
+            executor = ProcessPoolExecutor(max_workers=min(workers, len(documents)),
+                                           initializer=parsing_engine.configure_worker_logging,
+                                           initargs=(logging.getLogger().level,))
+        try:
+            futures = {executor.submit(rescan_document, text_store_dir, document, pdf_path, standard, output_directory,
+                                       **options): pdf_path for pdf_path, document in documents.items()}
+            for future in as_completed(futures):
+                pdf_file = os.path.basename(futures[future])
+                try:
+                    results[pdf_file] = future.result()
+                except Exception as e:
+                    logging.error(f"Worker failed while rescanning {pdf_file}: {e}")
+                    results[pdf_file] = parsing_engine.failure(standard, str(e))
+                if on_result:
+                    on_result(pdf_file, results[pdf_file])
+        finally:
+            if own_executor:
+                executor.shutdown()
+    if metrics_dir and isinstance(standard, list):
+        for name in standard:
+            metrics.record_results(metrics_dir, {pdf_file: result[name] for pdf_file, result in results.items()})
+    elif metrics_dir:
+        metrics.record_results(metrics_dir, results)
+    return results
+
+def run_parser_script(standard):
+    """Entry point of the <standard>-pdf-parser.py scripts."""
+    args = parsing_engine.parse_arguments()
+    parsing_engine.configure_logging(f"{standard}_pdf_parser", args.debug)
+    if args.rescan:
+        return rescan_store(standard, **parsing_engine.options_from_arguments(args))
+    if args.pdf:
+        return process_files(standard, args.pdf, **parsing_engine.options_from_arguments(args))
+    return process_directory(standard, **parsing_engine.options_from_arguments(args))
+
+def run_form_type(form_type, args):
+    """One pass of the p2ta entry points for one form type: rescan its stored text, or parse --pdf files or its folder."""
+    output_directory = "output_files"
+    if args.rescan:
+        # Re-match the text kept in --text-store-dir; no PDF is opened
+        results = rescan_store(form_type, output_directory=output_directory, **parsing_engine.options_from_arguments(args))
+        succeeded = sum(1 for result in results.values() if result["status"] == "success")
+        logging.info(f"Rescanned {succeeded}/{len(results)} stored documents for form type {form_type}")
+        return results
+
+    if args.pdf:
+        # Parse just the given files, e.g. one upload, instead of the whole folder
+        results = process_files(form_type, args.pdf, output_directory, pdf_directory=args.pdf_dir,
+                                **parsing_engine.options_from_arguments(args))
+    else:
+        # Use subdirectory based on form type
+        pdf_directory = args.pdf_dir or os.path.join("pdf_files_to_parse", form_type)
+        logging.info(f"Looking for PDF files in directory: {pdf_directory}")
+        if not os.path.exists(pdf_directory):
+            logging.error(f"Directory not found: {pdf_directory}")
+            return
+        os.makedirs(output_directory, exist_ok=True)
+        # Parse the new or changed PDFs (all of them with --full) in this process, or across a pool of worker processes
+        results = process_directory(form_type, pdf_directory, output_directory, **parsing_engine.options_from_arguments(args))
+    log_results(form_type, results)
+    return results
+
+def analyze_standards(standards, args):
+    """One pass of the p2ta entry points over one folder of PDFs for several form types, extracting each PDF only once."""
+    output_directory = "output_files"
+    if args.rescan:
+        results = rescan_store(standards, output_directory=output_directory, **parsing_engine.options_from_arguments(args))
+        logging.info(f"Rescanned {len(results)} stored documents for form types {', '.join(standards)}")
+        return results
+
+    pdf_directory = args.pdf_dir or os.path.join("pdf_files_to_parse", "multi")
+    if args.pdf:
+        parsed = process_files(standards, args.pdf, output_directory, pdf_directory=pdf_directory,
+                               **parsing_engine.options_from_arguments(args))
+        results = {standard: {pdf_file: result[standard] for pdf_file, result in parsed.items()} for standard in standards}
+    else:
+        logging.info(f"Looking for PDF files in directory: {pdf_directory}")
+        results = analyze_directory(standards, pdf_directory, output_directory, **parsing_engine.options_from_arguments(args))
+    for standard, standard_results in results.items():
+        log_results(standard, standard_results)
+    return results
+
+def log_results(standard, results):
+    """Log the outcome of every file of a pass for a standard, then the counts."""
+    for pdf_file, result in results.items():
+        if result["status"] == "success":
+            logging.info(f"Successfully parsed {pdf_file} for {standard}, output written to {result['output']}")
+        elif result["status"] == "unchanged":
+            logging.info(f"{pdf_file} is unchanged since the last run, keeping {result['output']}")
+        else:
+            logging.error(f"Error occurred while parsing {pdf_file} for {standard}: {result['error']}")
+    succeeded = sum(1 for result in results.values() if result["status"] == "success")
+    unchanged = sum(1 for result in results.values() if result["status"] == "unchanged")
+    logging.info(f"Parsed {succeeded}/{len(results) - unchanged} PDF files for form type {standard} "
+                 f"({unchanged} unchanged)")
@@ -0,0 +1,105 @@
+import os
+import json
+import hashlib
+import logging
+import contextlib
+import text_cache
+
+try:
+    import fcntl  # POSIX only; manifests are not locked elsewhere
+except ImportError:
+    fcntl = None
+
+# Manifest of the PDFs a directory run has already parsed, so repeated runs over a folder that
+# only ever grows (website uploads accumulate in pdf_files_to_parse/<form_type>) parse only new or
+# changed files. One JSON file per standard and source folder is kept next to the summaries it
+# describes, so a run over another folder (--pdf-dir) does not take the first folder's files for
+# deleted ones. A file is
+# unchanged when its size and mtime match the manifest; if only the mtime moved, its SHA-256 decides.
+# The manifest also records the pattern/matching variant, so editing a standard reparses everything.
+# The watch daemon and the website update the same manifests, so updates are made under a lock
+# and merged into the manifest as it is on disk (see directory_runs.update_manifest()).
+
+def manifest_path(output_directory, standard, pdf_directory):
+    folder = hashlib.sha256(os.path.abspath(pdf_directory).encode('utf-8')).hexdigest()[:12]
+    return os.path.join(output_directory, f".p2ta-manifest-{standard}-{folder}.json")
+
+def load_manifest(path, variant, quiet=False):
+    """Entries by filename from a previous run, or {} if there is none or it was for another variant."""
+    try:
+        with open(path, 'r', encoding='utf-8') as manifest_file:
+            manifest = json.load(manifest_file)
+    except FileNotFoundError:
+        return {}
+    except (OSError, ValueError) as e:
+        logging.warning(f"Ignoring unreadable manifest {path}: {e}")
+        return {}
+    if manifest.get("variant") != variant:
+        if not quiet:
+            logging.info("Patterns or matching options changed since the last run, reparsing all files")
+        return {}
+    return manifest.get("files", {})
+
+@contextlib.contextmanager
+def locked(path):
+    """Hold an exclusive lock on a manifest (on a .lock file next to it) while it is read and rewritten."""
+    if fcntl is None:
+        yield
+        return
+    with open(f"{path}.lock", 'a') as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+def save_manifest(path, variant, entries):
+    """Write the manifest atomically, so an interrupted run never leaves a truncated file."""
+    temporary_path = f"{path}.tmp"
+    with open(temporary_path, 'w', encoding='utf-8') as manifest_file:
+        json.dump({"variant": variant, "files": entries}, manifest_file, indent=2, sort_keys=True)
+    os.replace(temporary_path, path)
+
+def fingerprint(pdf_path, previous=None, sha256=None):
+    """Size, mtime and SHA-256 of a file; the hash is reused from previous when size and mtime match.
+
+    sha256 can give the hash when it is already known (e.g. computed while the file was received).
+    """
+    stat = os.stat(pdf_path)
+    entry = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+    if sha256:
+        entry["sha256"] = sha256
+    elif previous and previous.get("size") == stat.st_size and previous.get("mtime_ns") == stat.st_mtime_ns:
+        entry["sha256"] = previous["sha256"]
+    else:
+        entry["sha256"] = text_cache.file_sha256(pdf_path)
+    return entry
+
+def is_unchanged(entry, previous):
+    """True if a file's fingerprint matches its previous entry and that run's summary is still as it wrote it.
+
+    A summary that is gone or was rewritten since (its mtime moved) is written again. Records
+    appended to a JSONL results file are not checked: the file may have been rotated since.
+    """
+    return (previous is not None
+            and entry["size"] == previous.get("size")
+            and entry["sha256"] == previous.get("sha256")
+            and (previous.get("format") == "jsonl" or is_own_output(previous)))
+
+def is_own_output(previous):
+    """True if the summary recorded in a manifest entry still exists with the mtime it was written with."""
+    output_path = previous.get("output")
+    try:
+        return bool(output_path) and os.stat(output_path).st_mtime_ns == previous.get("output_mtime_ns")
+    except OSError:
+        return False
+
+def remove_output(pdf_file, previous):
+    """Delete the summary of a PDF that is gone, unless something else has rewritten it since."""
+    if not is_own_output(previous):
+        return
+    try:
+        os.remove(previous["output"])
+        logging.info(f"Removed summary of deleted PDF {pdf_file}: {previous['output']}")
+    except OSError:
+        pass
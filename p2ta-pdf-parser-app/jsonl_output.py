@@ -0,0 +1,53 @@
+import os
+import json
+import time
+import logging
+
+# Structured output: one JSON line per document, appended to a single file instead of one .txt
+# summary per PDF. Only the process that runs a directory pass writes to it (workers return
+# their records), so lines are never interleaved. The file is rotated like a log file once it
+# grows past a size limit, or a new file can be started for every run.
+
+RESULTS_FILE = 'p2ta_results.jsonl'
+DEFAULT_ROTATE_MB = 100
+BACKUP_COUNT = 5  # rotated files kept as p2ta_results.jsonl.1 ... .5
+
+OPEN_WRITERS = {}  # (output directory, per run) -> JsonlWriter, one per process
+
+def open_writer(output_directory, per_run=False, rotate_mb=DEFAULT_ROTATE_MB):
+    """Return the process-wide writer for an output directory, opening it on first use.
+
+    With per_run, a process writes to its own p2ta_results-<timestamp>.jsonl file, which is never
+    rotated; otherwise every run appends to p2ta_results.jsonl.
+    """
+    key = (output_directory, per_run)
+    writer = OPEN_WRITERS.get(key)
+    if writer is None:
+        if per_run:
+            name = f"p2ta_results-{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}.jsonl"
+            writer = JsonlWriter(os.path.join(output_directory, name), max_bytes=None)
+        else:
+            writer = JsonlWriter(os.path.join(output_directory, RESULTS_FILE), rotate_mb * 1024 * 1024)
+        OPEN_WRITERS[key] = writer
+    return writer
+
+class JsonlWriter:
+    """Appends JSON records to a file, rotating it when it would exceed max_bytes."""
+
+    def __init__(self, path, max_bytes=DEFAULT_ROTATE_MB * 1024 * 1024):
+        self.path = path
+        self.max_bytes = max_bytes
+
+    def write(self, record):
+        line = json.dumps(record, ensure_ascii=False) + "\n"
+        if self.max_bytes and os.path.exists(self.path) and os.path.getsize(self.path) + len(line) > self.max_bytes:
+            self.rotate()
+        with open(self.path, 'a', encoding='utf-8') as output_file:
+            output_file.write(line)
+
+    def rotate(self):
+        for index in range(BACKUP_COUNT - 1, 0, -1):
+            if os.path.exists(f"{self.path}.{index}"):
+                os.replace(f"{self.path}.{index}", f"{self.path}.{index + 1}")
+        os.replace(self.path, f"{self.path}.1")
+        logging.info(f"Rotated {self.path}")
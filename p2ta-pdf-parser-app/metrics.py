@@ -0,0 +1,118 @@
+import os
+import json
+import time
+
+# Per-document stage timers and counters, emitted as JSON lines and aggregated into a
+# Prometheus text file (for node_exporter's textfile collector or a quick look).
+# Collection is off unless a metrics directory is given; the parsing path then only checks
+# `metrics is not None` once per page or chunk.
+#
+# Stages: "open" (pymupdf.open), "extract" (load_page/get_text), "normalize" (whitespace
+# collapsing), "match" (the pattern scan; "step_seconds" breaks down the part of it spent in each
+# step's patterns) and "write" (the summary file). Page ranges extracted by other workers (see
+# parsing_engine.parse_files) are not timed, only their normalization and matching; neither is
+# the single extraction shared by the standards of a multi-standard run (process_pdf_standards).
+
+DOCUMENTS_FILE = 'documents.jsonl'
+PROMETHEUS_FILE = 'p2ta_metrics.prom'
+
+TOTALS = {}  # (metric name, labels) -> value, accumulated over the life of this process
+
+METRIC_HELP = {
+    "p2ta_documents_total": ("counter", "Documents processed, by status."),
+    "p2ta_document_seconds_total": ("counter", "Wall time spent processing documents."),
+    "p2ta_stage_seconds_total": ("counter", "Time spent in each parsing stage."),
+    "p2ta_pages_total": ("counter", "Pages extracted."),
+    "p2ta_characters_total": ("counter", "Characters of normalized text matched."),
+    "p2ta_skipped_chunks_total": ("counter", "Pages skipped by the literal prefilter."),
+    "p2ta_step_matches_total": ("counter", "Matches found per step."),
+    "p2ta_step_seconds_total": ("counter", "Time spent trying each step's patterns."),
+}
+
+class DocumentMetrics:
+    """Stage timers and counters of one document."""
+
+    def __init__(self, standard, pdf_path):
+        self.standard = standard
+        self.pdf_path = pdf_path
+        self.started = time.perf_counter()
+        self.stages = {}
+        self.pages = 0
+        self.characters = 0
+        self.step_matches = {}
+        self.step_seconds = {}
+        self.skipped_chunks = 0  # pages (chunks of text) the literal prefilter ruled out
+        self.cached = None  # "summary" or "pages" when the cache saved work, "store" for the text store
+
+    def add_time(self, stage, seconds):
+        self.stages[stage] = self.stages.get(stage, 0.0) + seconds
+
+    def record(self, status):
+        """The JSON-serializable record of this document."""
+        return {
+            "timestamp": time.time(),
+            "standard": self.standard,
+            "pdf": os.path.basename(self.pdf_path),
+            "status": status,
+            "seconds": time.perf_counter() - self.started,
+            "stages": self.stages,
+            "pages": self.pages,
+            "characters": self.characters,
+            "skipped_chunks": self.skipped_chunks,
+            "step_matches": self.step_matches,
+            "step_seconds": self.step_seconds,
+            "cached": self.cached,
+        }
+
+def write_record(metrics_dir, record):
+    """Append a document record as one JSON line (a single append, so workers can share the file)."""
+    os.makedirs(metrics_dir, exist_ok=True)
+    with open(os.path.join(metrics_dir, DOCUMENTS_FILE), 'a', encoding='utf-8') as documents_file:
+        documents_file.write(json.dumps(record, sort_keys=True) + "\n")
+
+def add(name, labels, value):
+    key = (name, tuple(sorted(labels.items())))
+    TOTALS[key] = TOTALS.get(key, 0) + value
+
+def aggregate(record):
+    """Add a document record to this process's totals."""
+    standard = record["standard"]
+    add("p2ta_documents_total", {"standard": standard, "status": record["status"]}, 1)
+    add("p2ta_document_seconds_total", {"standard": standard}, record["seconds"])
+    for stage, seconds in record["stages"].items():
+        add("p2ta_stage_seconds_total", {"standard": standard, "stage": stage}, seconds)
+    add("p2ta_pages_total", {"standard": standard}, record["pages"])
+    add("p2ta_characters_total", {"standard": standard}, record["characters"])
+    add("p2ta_skipped_chunks_total", {"standard": standard}, record.get("skipped_chunks", 0))
+    for step, matches in record["step_matches"].items():
+        add("p2ta_step_matches_total", {"standard": standard, "step": step}, matches)
+    for step, seconds in record["step_seconds"].items():
+        add("p2ta_step_seconds_total", {"standard": standard, "step": step}, seconds)
+
+def escape_label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def write_prometheus(metrics_dir):
+    """Rewrite the Prometheus text file from the current totals, atomically."""
+    lines = []
+    for name, (metric_type, help_text) in METRIC_HELP.items():
+        samples = sorted((labels, value) for (metric, labels), value in TOTALS.items() if metric == name)
+        if not samples:
+            continue
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {metric_type}")
+        for labels, value in samples:
+            label_text = ",".join(f'{key}="{escape_label(label)}"' for key, label in labels)
+            lines.append(f"{name}{{{label_text}}} {value:.6g}" if isinstance(value, float) else f"{name}{{{label_text}}} {value}")
+    os.makedirs(metrics_dir, exist_ok=True)
+    path = os.path.join(metrics_dir, PROMETHEUS_FILE)
+    with open(f"{path}.tmp", 'w', encoding='utf-8') as prometheus_file:
+        prometheus_file.write("\n".join(lines) + "\n")
+    os.replace(f"{path}.tmp", path)
+
+def record_results(metrics_dir, results):
+    """Aggregate the metrics returned with a directory run's results and rewrite the Prometheus file."""
+    for result in results.values():
+        if result.get("metrics"):
+            aggregate(result["metrics"])
+    write_prometheus(metrics_dir)
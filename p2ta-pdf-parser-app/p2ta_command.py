@@ -0,0 +1,24 @@
+import parsing_engine
+import directory_runs
+import watch_daemon
+import standard_detector
+
+# What p2ta-pdf-parser.py (and its variant without Docker) does with its parsed command line:
+# start the watch daemon, route the auto folder, or run one pass over one or several form types.
+
+def run_p2ta(args):
+    """Entry point of p2ta-pdf-parser.py (and its variant without Docker): watch the folders, or run one pass."""
+    standards = args.form_type or []
+    if args.watch:
+        # Keep running and parse PDFs as they land, with warm worker processes
+        if not standards or standards == [standard_detector.AUTO]:
+            standards = list(parsing_engine.STANDARDS) + [standard_detector.AUTO]
+        return watch_daemon.run(standards, "pdf_files_to_parse", "output_files", poll=args.poll,
+                                poll_interval=args.poll_interval, rescan_interval=args.rescan_interval,
+                                detect_options=standard_detector.detection_options(args),
+                                **parsing_engine.options_from_arguments(args))
+    if standards == [standard_detector.AUTO]:
+        return standard_detector.route_and_parse(args)
+    if len(standards) > 1:
+        return directory_runs.analyze_standards(standards, args)
+    return directory_runs.run_form_type(standards[0], args)
@@ -0,0 +1,1191 @@
+import logging
+import os
+import re
+import json
+import time
+import hashlib
+import bisect
+import argparse
+import contextlib
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import pymupdf  # Import pymupdf from PyMuPDF
+from re import _parser as regex_parser  # Used to compute the longest possible match of a pattern
+import text_cache  # Content-addressed cache of extracted text and summaries
+import text_store  # Persistent store of extracted text for re-matching
+import metrics  # Per-document stage timers and counters
+import jsonl_output  # Structured one-line-per-document output
+
+# Shared parsing engine used by every standard-specific parser script.
+# Each standard is described as data (its steps and their regex patterns) and all
+# patterns are compiled once per process, when this module is first imported.
+
+LOG_FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
+
+# Registry of supported standards. Every step has:
+#   name        - label used when matches are found ("<name>: a; b")
+#   description - label used when nothing matches ("<description>: Not Found")
+#   patterns    - case-insensitive regular expressions searched in the document text
+STANDARDS = {
+    "asc606": [
+        {
+            "name": "Identify Contract",
+            "description": "Contract Identification",
+            "patterns": [
+                r'contract.*?with.*?customer',  # Look for phrases indicating a contract with a customer
+                r'agreement.*?between.*?parties'  # Look for phrases indicating an agreement between parties
+            ],
+        },
+        {
+            "name": "Identify Performance Obligations",
+            "description": "Performance Obligations",
+            "patterns": [
+                r'performance obligation.*?(include|consist of)',  # Look for phrases describing performance obligations
+                r'obligation.*?to provide'  # Look for obligations to provide a service or product
+            ],
+        },
+        {
+            "name": "Determine Transaction Price",
+            "description": "Transaction Price Determination",
+            "patterns": [
+                r'transaction price.*?(is|amounts to)',  # Look for phrases specifying the transaction price
+                r'fee.*?for services'  # Look for fees related to services provided
+            ],
+        },
+        {
+            "name": "Allocate Transaction Price",
+            "description": "Transaction Price Allocation",
+            "patterns": [
+                r'allocate.*?price.*?to.*?obligations',  # Look for phrases about allocating price to obligations
+                r'pricing allocation.*?obligations'  # Look for pricing allocation details
+            ],
+        },
+        {
+            "name": "Recognize Revenue",
+            "description": "Revenue Recognition",
+            "patterns": [
+                r'revenue.*?recognition.*?(when|upon)',  # Look for phrases indicating revenue recognition timing
+                r'satisfaction.*?performance obligation'  # Look for satisfaction of performance obligations
+            ],
+        },
+    ],
+    "asc842": [
+        {"name": "Lease Identification", "description": "Lease Identification",
+         "patterns": [r'lease agreement', r'lease contract', r'terms of lease']},
+        {"name": "Lease Term Determination", "description": "Lease Term Determination",
+         "patterns": [r'lease term.*?(months|years)', r'renewal option', r'lease period']},
+        {"name": "Lease Payments", "description": "Lease Payments",
+         "patterns": [r'lease payments.*?amounts', r'total lease cost', r'periodic payment']},
+        {"name": "Discount Rate Calculation", "description": "Discount Rate Calculation",
+         "patterns": [r'discount rate.*?is', r'interest rate.*?applied']},
+        {"name": "Liability and Asset Recognition", "description": "Liability and Asset Recognition",
+         "patterns": [r'right-of-use asset', r'lease liability', r'liability recognized']},
+    ],
+    "asc805": [
+        {"name": "Acquisition Date Determination", "description": "Acquisition Date Determination",
+         "patterns": [r'acquisition date.*?(is|was)', r'date of acquisition']},
+        {"name": "Fair Value Assessment", "description": "Fair Value Assessment",
+         "patterns": [r'fair value.*?assets', r'valuation of.*?liabilities']},
+        {"name": "Goodwill Calculation", "description": "Goodwill Calculation",
+         "patterns": [r'goodwill.*?amounts', r'excess of consideration over.*?net assets']},
+        {"name": "Purchase Consideration Allocation", "description": "Purchase Consideration Allocation",
+         "patterns": [r'consideration allocated to.*?assets', r'purchase consideration']},
+        {"name": "Disclosure Requirements", "description": "Disclosure Requirements",
+         "patterns": [r'disclosures related to business combinations', r'information required.*?acquisitions']},
+    ],
+    "asc718": [
+        {"name": "Grant Date Identification", "description": "Grant Date Identification",
+         "patterns": [r'grant date.*?is', r'date of grant']},
+        {"name": "Fair Value Measurement", "description": "Fair Value Measurement",
+         "patterns": [r'fair value.*?compensation', r'valuation of equity awards']},
+        {"name": "Vesting Period and Conditions", "description": "Vesting Period and Conditions",
+         "patterns": [r'vesting period.*?is', r'duration of vesting']},
+        {"name": "Expense Recognition", "description": "Expense Recognition",
+         "patterns": [r'stock compensation expense', r'expense recognition.*?equity awards']},
+        {"name": "Tax Implications", "description": "Tax Implications",
+         "patterns": [r'tax implications of stock compensation', r'tax treatment of equity awards']},
+    ],
+    "asc815": [
+        {"name": "Derivative Identification", "description": "Derivative Identification",
+         "patterns": [r'derivative instrument', r'derivatives embedded in contracts']},
+        {"name": "Hedging Relationship Assessment", "description": "Hedging Relationship Assessment",
+         "patterns": [r'hedging relationship.*?established', r'designation as hedge']},
+        {"name": "Fair Value Measurement", "description": "Fair Value Measurement",
+         "patterns": [r'fair value of derivative', r'market value of hedge']},
+        {"name": "Effectiveness Testing", "description": "Effectiveness Testing",
+         "patterns": [r'test of hedge effectiveness', r'effectiveness assessment']},
+        {"name": "Disclosure Requirements", "description": "Disclosure Requirements",
+         "patterns": [r'derivative disclosures', r'hedging information requirements']},
+    ],
+    "ifrs15": [
+        {"name": "Contract Identification", "description": "Contract Identification",
+         "patterns": [r'contract with customer', r'agreement details']},
+        {"name": "Performance Obligations Identification", "description": "Performance Obligations Identification",
+         "patterns": [r'performance obligations include', r'list of obligations']},
+        {"name": "Transaction Price Determination (Multi-Currency)", "description": "Transaction Price Determination (Multi-Currency)",
+         "patterns": [r'transaction price in foreign currency', r'price allocation']},
+        {"name": "Allocation of Transaction Price", "description": "Allocation of Transaction Price",
+         "patterns": [r'allocating price to obligations', r'price breakdown by performance']},
+        {"name": "Revenue Recognition Timing", "description": "Revenue Recognition Timing",
+         "patterns": [r'revenue recognized.*?completion', r'timing of revenue recognition']},
+    ],
+    "asc450": [
+        {"name": "Contingency Identification", "description": "Contingency Identification",
+         "patterns": [r'contingent liability', r'potential loss event']},
+        {"name": "Loss Probability Assessment", "description": "Loss Probability Assessment",
+         "patterns": [r'probability of loss', r'likelihood of adverse outcome']},
+        {"name": "Estimate of Loss Amount", "description": "Estimate of Loss Amount",
+         "patterns": [r'estimated loss amount', r'potential financial impact']},
+        {"name": "Recognition and Measurement", "description": "Recognition and Measurement",
+         "patterns": [r'contingency measurement', r'liability recognition']},
+        {"name": "Disclosure of Contingencies", "description": "Disclosure of Contingencies",
+         "patterns": [r'disclosure of contingency', r'information required for contingencies']},
+    ],
+    "asc320": [
+        {"name": "Investment Identification", "description": "Investment Identification",
+         "patterns": [r'investment in securities', r'financial instruments', r'assets held for investment']},
+        {"name": "Classification (Held-to-Maturity, Available-for-Sale)", "description": "Classification (Held-to-Maturity, Available-for-Sale)",
+         "patterns": [r'held-to-maturity', r'available-for-sale', r'trading securities']},
+        {"name": "Fair Value Measurement", "description": "Fair Value Measurement",
+         "patterns": [r'fair value of investment', r'valuation of securities', r'market value']},
+        {"name": "Impairment Analysis", "description": "Impairment Analysis",
+         "patterns": [r'impairment of investment', r'loss on investment', r'write-down of securities']},
+        {"name": "Disclosure Requirements", "description": "Disclosure Requirements",
+         "patterns": [r'disclosure of investment', r'information required for investments', r'required disclosures']},
+    ],
+    "asc330": [
+        {"name": "Inventory Identification", "description": "Inventory Identification",
+         "patterns": [r'inventory items', r'stock of goods', r'raw materials']},
+        {"name": "Inventory Cost Measurement", "description": "Inventory Cost Measurement",
+         "patterns": [r'cost of inventory', r'inventory valuation', r'cost of goods sold']},
+        {"name": "Lower of Cost or Market Analysis", "description": "Lower of Cost or Market Analysis",
+         "patterns": [r'lower of cost or market', r'inventory at cost or market', r'valuation at lower of cost or market']},
+        {"name": "Inventory Valuation Adjustment", "description": "Inventory Valuation Adjustment",
+         "patterns": [r'inventory write-down', r'inventory adjustment', r'reduction in inventory value']},
+        {"name": "Disclosure Requirements", "description": "Disclosure Requirements",
+         "patterns": [r'inventory disclosures', r'disclosure of inventory policies', r'financial reporting for inventory']},
+    ],
+    "asc250": [
+        {"name": "Change Identification", "description": "Change Identification",
+         "patterns": [r'change in accounting', r'change in policy', r'change in estimate']},
+        {"name": "Type of Change (Principle, Estimate, Entity)", "description": "Type of Change (Principle, Estimate, Entity)",
+         "patterns": [r'change in principle', r'change in estimate', r'change in reporting entity']},
+        {"name": "Error Correction Analysis", "description": "Error Correction Analysis",
+         "patterns": [r'error correction', r'prior period adjustment', r'correction of error']},
+        {"name": "Retrospective Adjustment", "description": "Retrospective Adjustment",
+         "patterns": [r'retrospective adjustment', r'prior period restatement', r'cumulative adjustment']},
+        {"name": "Disclosure Requirements", "description": "Disclosure Requirements",
+         "patterns": [r'disclosures for accounting changes', r'disclosures for error corrections', r'required disclosures']},
+    ],
+}
+
+def compile_standards(standards):
+    """Compile every step's patterns once, keyed by standard."""
+    return {
+        standard: [
+            (step["name"], step["description"], [re.compile(pattern, re.IGNORECASE) for pattern in step["patterns"]])
+            for step in steps
+        ]
+        for standard, steps in standards.items()
+    }
+
+COMPILED_STANDARDS = compile_standards(STANDARDS)
+
+# Single-pass scanner
+#
+# Every pattern starts with a literal (e.g. "contract" in r'contract.*?with.*?customer'), and a
+# pattern can only match where its literal occurs. Instead of running one finditer() per pattern
+# over the whole document, the scanner walks a case-folded copy of the text once with a combined
+# alternation of all leading literals, and only tries the full patterns at the positions it finds.
+# Matches are kept non-overlapping per pattern, exactly like finditer(), so the summary is
+# byte-identical to running every pattern separately.
+# Text is scanned page by page, and a page is first checked with str.find() for the shortest
+# literals (a page without "obligation" cannot contain "performance obligation"). Pages without
+# any of them, most pages of a long filing, skip the anchor search and the patterns entirely.
+
+REGEX_METACHARACTERS = set('.^$*+?{}[]\\|()')
+
+# Non-ASCII characters that re.IGNORECASE treats as ASCII letters; lower() alone misses them
+# (and turns U+0130 into two characters), so they are mapped first to keep offsets aligned.
+CASE_FOLD_FIXES = str.maketrans({'\u0130': 'i', '\u0131': 'i', '\u017f': 's', '\u212a': 'k'})
+
+def fold_case(text):
+    """Lowercase the text without changing its length."""
+    return text.translate(CASE_FOLD_FIXES).lower()
+
+def leading_literal(pattern):
+    """Return the literal text every match of the pattern must start with ("" if there is none)."""
+    # A top-level alternation means no single literal is required
+    depth = 0
+    escaped = False
+    for char in pattern:
+        if escaped:
+            escaped = False
+        elif char == '\\':
+            escaped = True
+        elif char == '(':
+            depth += 1
+        elif char == ')':
+            depth -= 1
+        elif char == '|' and depth == 0:
+            return ""
+    literal = ""
+    for char in pattern:
+        if char in REGEX_METACHARACTERS:
+            # A quantifier makes the preceding character optional or repeatable
+            if char in '*?{':
+                literal = literal[:-1]
+            return literal
+        literal += char
+    return literal
+
+def build_scanner(compiled_steps):
+    """Prepare the combined anchor regex and the per-pattern dispatch table for one standard."""
+    anchors = {}  # case-folded literal -> indexes of the patterns starting with it
+    patterns = []  # (step index, compiled pattern) in summary order
+    fallback = []  # indexes of patterns without a usable leading literal
+    for step_index, (step_name, description, step_patterns) in enumerate(compiled_steps):
+        for pattern in step_patterns:
+            pattern_index = len(patterns)
+            patterns.append((step_index, pattern))
+            literal = fold_case(leading_literal(pattern.pattern))
+            if not literal or not literal.isascii():
+                fallback.append(pattern_index)
+                continue
+            anchors.setdefault(literal, []).append(pattern_index)
+    # Group anchors by first character so a hit only checks the literals that can start there
+    anchors_by_first_char = {}
+    for literal, pattern_indexes in anchors.items():
+        anchors_by_first_char.setdefault(literal[0], []).append((literal, pattern_indexes))
+    # Longest text any pattern can match; None when a pattern is unbounded (e.g. ".*?")
+    max_match_length = 0
+    for step_index, pattern in patterns:
+        longest = regex_parser.parse(pattern.pattern, pattern.flags).getwidth()[1]
+        if longest >= regex_parser.MAXREPEAT or fallback:
+            max_match_length = None
+            break
+        max_match_length = max(max_match_length, longest)
+    # Literals that do not contain another literal; a page without any of them has no anchor
+    prefilter = []
+    for literal in sorted(anchors, key=len):
+        if not any(shorter in literal for shorter in prefilter):
+            prefilter.append(literal)
+    combined = None
+    if anchors:
+        # Longest literals first so the alternation never stops at a shorter prefix of another anchor
+        combined = re.compile('|'.join(re.escape(literal) for literal in sorted(anchors, key=len, reverse=True)))
+    return {
+        "combined": combined,
+        "anchors": anchors_by_first_char,
+        "longest_anchor": max((len(literal) for literal in anchors), default=0),
+        "prefilter": prefilter,
+        "patterns": patterns,
+        "fallback": fallback,
+        "max_match_length": max_match_length,
+    }
+
+def scan_range(buffer, base, start, stop, scanner, matches, next_allowed, pattern_seconds=None, folded=None):
+    """Try every pattern at the anchors starting in buffer[start:stop]; buffer begins at offset base.
+
+    folded can pass fold_case(buffer) when it is already known. Return False if the range has
+    none of the scanner's literals and was skipped without searching for anchors.
+    With pattern_seconds, the time spent trying each pattern is added to its entry.
+    """
+    patterns = scanner["patterns"]
+    if folded is None:
+        folded = fold_case(buffer)
+    # Anchors starting before stop are complete within this end position
+    end = min(len(buffer), stop + scanner["longest_anchor"] - 1)
+    if scanner["prefilter"] and not any(folded.find(literal, start, end) >= 0 for literal in scanner["prefilter"]):
+        return False
+    anchor = scanner["combined"].search(folded, start, end)
+    while anchor and anchor.start() < stop:
+        position = anchor.start()
+        for literal, pattern_indexes in scanner["anchors"][folded[position]]:
+            if not folded.startswith(literal, position):
+                continue
+            for pattern_index in pattern_indexes:
+                if base + position < next_allowed[pattern_index]:
+                    continue
+                if pattern_seconds is None:
+                    match = patterns[pattern_index][1].match(buffer, position)
+                else:
+                    started = time.perf_counter()
+                    match = patterns[pattern_index][1].match(buffer, position)
+                    pattern_seconds[pattern_index] += time.perf_counter() - started
+                if match:
+                    matches[pattern_index].append((base + match.start(), base + match.end(), match.group()))
+                    next_allowed[pattern_index] = base + match.end()
+        # Search again from the next character so overlapping anchors are not skipped
+        anchor = scanner["combined"].search(folded, position + 1, end)
+    return True
+
+def scan_chunks(chunks, scanner, metrics=None, max_per_step=None):
+    """Scan a stream of normalized text chunks; return (per-pattern matches, text length).
+
+    Each match is a (start, end, text) tuple with offsets into the concatenated chunks. When every
+    pattern has a bounded length only that many characters are kept between chunks, so memory stays
+    flat however long the document is. Otherwise the chunks are joined and scanned as one text.
+    With max_per_step and bounded patterns, no more chunks are read once every step has that many
+    matches (the text length returned is then that of the chunks read).
+    With metrics, the scan is timed as the "match" stage, per-pattern times are kept in
+    metrics.pattern_seconds and the chunks skipped by the literal prefilter are counted.
+    """
+    patterns = scanner["patterns"]
+    matches = [[] for _ in patterns]
+    next_allowed = [0] * len(patterns)  # finditer() never returns overlapping matches for one pattern
+    pattern_seconds = None
+    if metrics is not None:
+        pattern_seconds = metrics.pattern_seconds = [0.0] * len(patterns)
+    overlap = scanner["max_match_length"]
+    if overlap is None:
+        chunks = join_chunks(chunks, scanner, matches, next_allowed, pattern_seconds, metrics)
+    buffer = ""
+    base = 0  # offset of buffer[0] in the whole text
+    for chunk in chunks:
+        buffer += chunk
+        # Positions whose longest possible match is already inside the buffer can be scanned now
+        stop = len(buffer) - overlap if overlap is not None else 0
+        if scanner["combined"] is not None and stop > 0:
+            started = time.perf_counter() if metrics is not None else None
+            scanned = scan_range(buffer, base, 0, stop, scanner, matches, next_allowed, pattern_seconds)
+            if metrics is not None:
+                metrics.add_time("match", time.perf_counter() - started)
+                metrics.skipped_chunks += not scanned
+        if stop > 0:
+            base += stop
+            buffer = buffer[stop:]
+            if max_per_step and steps_complete(scanner, matches, max_per_step):
+                # Everything before base is scanned; the rest of the document cannot change the result
+                logging.debug(f"Every step has {max_per_step} matches after {base} characters, stopping early")
+                return matches, base + len(buffer)
+    started = time.perf_counter()
+    if scanner["combined"] is not None and buffer and overlap is not None:
+        scanned = scan_range(buffer, base, 0, len(buffer), scanner, matches, next_allowed, pattern_seconds)
+        if metrics is not None:
+            metrics.skipped_chunks += not scanned
+    text_length = base + len(buffer)
+    for pattern_index in scanner["fallback"]:
+        # Only reached with overlap None, so the buffer holds the whole text
+        pattern_started = time.perf_counter()
+        matches[pattern_index] = [(match.start(), match.end(), match.group()) for match in patterns[pattern_index][1].finditer(buffer)]
+        if pattern_seconds is not None:
+            pattern_seconds[pattern_index] += time.perf_counter() - pattern_started
+    if metrics is not None:
+        metrics.add_time("match", time.perf_counter() - started)
+    return matches, text_length
+
+def join_chunks(chunks, scanner, matches, next_allowed, pattern_seconds=None, metrics=None):
+    """Join the chunks for unbounded patterns and scan the anchors of each chunk's range of the text.
+
+    Patterns still match across the whole text; ranges are only used to skip the anchor search
+    where the prefilter finds no literal. Return the joined text as the single remaining chunk.
+    """
+    chunk_ends = []
+    text = []
+    length = 0
+    for chunk in chunks:
+        text.append(chunk)
+        length += len(chunk)
+        chunk_ends.append(length)
+    text = "".join(text)
+    if scanner["combined"] is None or not text:
+        return [text]
+    started = time.perf_counter()
+    folded = fold_case(text)
+    start = 0
+    for stop in chunk_ends:
+        if stop > start:
+            scanned = scan_range(text, 0, start, stop, scanner, matches, next_allowed, pattern_seconds, folded)
+            if metrics is not None:
+                metrics.skipped_chunks += not scanned
+        start = stop
+    if metrics is not None:
+        metrics.add_time("match", time.perf_counter() - started)
+    return [text]
+
+def steps_complete(scanner, matches, max_per_step):
+    """True if every step has at least max_per_step matches across its patterns."""
+    counts = [0] * (scanner["patterns"][-1][0] + 1)
+    for (step_index, pattern), pattern_matches in zip(scanner["patterns"], matches):
+        counts[step_index] += len(pattern_matches)
+    return min(counts) >= max_per_step
+
+def scan(text, scanner):
+    """Walk the text once and return the list of (start, end, text) matches for every pattern."""
+    return scan_chunks([text], scanner)[0]
+
+SCANNERS = {standard: build_scanner(steps) for standard, steps in COMPILED_STANDARDS.items()}
+
+# Window-bounded matching
+#
+# The whitespace-normalized text has no line breaks, so a lazy gap such as the ".*?" in
+# r'contract.*?with.*?customer' can run across tens of thousands of characters, and documents
+# with many unterminated anchors take super-linear time. In window mode every unbounded gap is
+# rewritten to a bounded one: either at most N characters, or at most the rest of the sentence
+# (no ".", "!" or "?" in the gap, still capped so text without punctuation stays linear).
+# Every match attempt then costs at most a fixed amount of work, so total time grows linearly
+# with document length and matched text stays short.
+
+SENTENCE_WINDOW_MAX_CHARS = 500
+UNBOUNDED_GAP = re.compile(r'(?<!\\)\.[*+]\??')
+
+def parse_match_window(value):
+    """Validate a --match-window value: "sentence" or a positive number of characters."""
+    if value == "sentence":
+        return value
+    try:
+        window = int(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid match window: {value!r} (use 'sentence' or a number of characters)")
+    if window <= 0:
+        raise argparse.ArgumentTypeError(f"match window must be positive: {value!r}")
+    return window
+
+def bound_pattern(pattern, window):
+    """Rewrite the pattern's unbounded ".*?" / ".+?" gaps so they cannot cross the window."""
+    if window == "sentence":
+        gap_class, max_chars = '[^.!?]', SENTENCE_WINDOW_MAX_CHARS
+    else:
+        gap_class, max_chars = '.', window
+
+    def bounded_gap(match):
+        min_chars = 1 if '+' in match.group() else 0
+        lazy = '?' if match.group().endswith('?') else ''
+        return f'{gap_class}{{{min_chars},{max_chars}}}{lazy}'
+
+    return UNBOUNDED_GAP.sub(bounded_gap, pattern)
+
+WINDOWED_STANDARDS = {}  # (standard, window) -> (compiled steps, scanner), built on first use
+
+def get_compiled_standard(standard, match_window=None):
+    """Return the compiled steps and scanner for a standard, optionally in window-bounded mode."""
+    if match_window is None:
+        return COMPILED_STANDARDS[standard], SCANNERS[standard]
+    key = (standard, match_window)
+    if key not in WINDOWED_STANDARDS:
+        compiled_steps = [
+            (step_name, description, [re.compile(bound_pattern(pattern.pattern, match_window), re.IGNORECASE) for pattern in patterns])
+            for step_name, description, patterns in COMPILED_STANDARDS[standard]
+        ]
+        WINDOWED_STANDARDS[key] = (compiled_steps, build_scanner(compiled_steps))
+    return WINDOWED_STANDARDS[key]
+
+# Command line and logging setup shared by the parser scripts
+
+def positive_int(value):
+    """argparse type for options that need a whole number of at least 1."""
+    try:
+        number = int(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid number: {value!r}")
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1: {value!r}")
+    return number
+
+def parse_standards(value):
+    """argparse type for one standard, a comma-separated list of standards, or "all"."""
+    if value == "all":
+        return list(STANDARDS)
+    standards = list(dict.fromkeys(standard.strip() for standard in value.split(",") if standard.strip()))
+    unknown = [standard for standard in standards if standard not in STANDARDS]
+    if unknown or not standards:
+        raise argparse.ArgumentTypeError(f"unknown standard: {', '.join(unknown) or value!r} "
+                                         f"(choose from {', '.join(STANDARDS)} or all)")
+    return standards
+
+def add_parsing_arguments(parser):
+    """Add the options shared by the parser scripts and the p2ta entry points."""
+    parser.add_argument('--match-window', type=parse_match_window, default=None,
+                        help="Limit pattern gaps to a window: 'sentence' or a number of characters (default: unbounded)")
+    parser.add_argument('--max-matches-per-step', type=positive_int, default=None,
+                        help="Keep only the first N matches of each step; with --match-window, stop reading a PDF "
+                             "once every step has them (1 checks presence only; default: all matches)")
+    parser.add_argument('--workers', type=positive_int, default=os.cpu_count() or 1,
+                        help="Number of worker processes used to parse PDFs in parallel (default: CPU count)")
+    parser.add_argument('--split-pages', type=positive_int, default=DEFAULT_SPLIT_PAGES,
+                        help=f"Extract PDFs with more pages than this in parallel page ranges (default: {DEFAULT_SPLIT_PAGES})")
+    parser.add_argument('--extraction-profile', choices=EXTRACTION_PROFILES, default=None,
+                        help="fast: minimal PyMuPDF text flags; accurate: text blocks in reading order, dehyphenated "
+                             "(default: the standard's profile, normally 'default')")
+    parser.add_argument('--cache-dir', default=None,
+                        help="Cache extracted text and summaries in this directory, keyed by the PDF's SHA-256 (default: no cache)")
+    parser.add_argument('--cache-size-mb', type=positive_int, default=DEFAULT_CACHE_SIZE_MB,
+                        help=f"Maximum cache size; least recently used entries are evicted first (default: {DEFAULT_CACHE_SIZE_MB})")
+    parser.add_argument('--metrics-dir', default=None,
+                        help="Write per-document stage timings and counters (JSON lines) and Prometheus totals to this directory")
+    parser.add_argument('--text-store-dir', default=None,
+                        help="Keep the extracted text of every PDF in this directory, so --rescan can re-match without PyMuPDF")
+    parser.add_argument('--rescan', action='store_true',
+                        help="Match the standard against every document in --text-store-dir instead of parsing PDFs")
+    parser.add_argument('--pdf', action='append', default=None, metavar='PATH',
+                        help="Parse only this PDF instead of the standard's whole folder (repeat for several files)")
+    parser.add_argument('--output-format', choices=["txt", "jsonl"], default="txt",
+                        help="txt: one summary file per PDF; jsonl: one JSON line per PDF with every match, its offsets "
+                             f"and page, appended to {jsonl_output.RESULTS_FILE} (default: txt)")
+    parser.add_argument('--jsonl-per-run', action='store_true',
+                        help="With --output-format jsonl, write a new results file for every run instead of one rotating file")
+    parser.add_argument('--jsonl-rotate-mb', type=positive_int, default=jsonl_output.DEFAULT_ROTATE_MB,
+                        help=f"Rotate the JSONL results file when it grows past this size (default: {jsonl_output.DEFAULT_ROTATE_MB})")
+    parser.add_argument('--full', action='store_true',
+                        help="Reparse every PDF instead of only the files that are new or changed since the last run")
+    return parser
+
+def options_from_arguments(args):
+    """Keyword arguments for directory_runs.process_directory() taken from the parsed command line."""
+    return {
+        "workers": args.workers,
+        "split_pages": args.split_pages,
+        "match_window": args.match_window,
+        "max_matches_per_step": args.max_matches_per_step,
+        "extraction_profile": args.extraction_profile,
+        "cache_dir": args.cache_dir,
+        "cache_size_mb": args.cache_size_mb,
+        "metrics_dir": args.metrics_dir,
+        "text_store_dir": args.text_store_dir,
+        "output_format": args.output_format,
+        "jsonl_per_run": args.jsonl_per_run,
+        "jsonl_rotate_mb": args.jsonl_rotate_mb,
+        "full": args.full,
+    }
+
+def parse_arguments(description="Process PDF files and extract relevant information."):
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument('--debug', action='store_true', help="Enable debug logging")
+    add_parsing_arguments(parser)
+    return parser.parse_args()
+
+def configure_logging(log_name, debug=False):
+    logging_level = logging.DEBUG if debug else logging.INFO
+    logging.basicConfig(level=logging_level, format=LOG_FORMAT)
+    # Add file handler to retain logs for future reference
+    logs_path = 'p2ta-pdf-parser-app/logs'
+    os.makedirs(logs_path, exist_ok=True)
+    file_handler = logging.FileHandler(os.path.join(logs_path, f'{log_name}.log'))
+    file_handler.setFormatter(logging.Formatter(LOG_FORMAT))
+    logging.getLogger().addHandler(file_handler)
+    logging.getLogger().setLevel(logging.INFO)
+
+def configure_worker_logging(level):
+    """Initialize logging in pool workers (a no-op when handlers were inherited through fork)."""
+    logging.basicConfig(level=level, format=LOG_FORMAT)
+    logging.getLogger().setLevel(level)
+
+# Step 1: Extract text from PDF using PyMuPDF, one page at a time
+#
+# Extraction profiles trade text quality for speed:
+#   default   get_text("text") with PyMuPDF's default flags, the text summaries were always built from
+#   fast      a TextPage built with the mediabox clip flag only: ligatures are expanded, whitespace
+#             is not preserved (it is collapsed before matching anyway) and unknown glyphs are
+#             dropped instead of kept as CID codes
+#   accurate  the page's text blocks in reading order, with words hyphenated across lines joined,
+#             for multi-column layouts where the default order interleaves the columns
+# A profile changes the extracted text, so it is part of the cache and text store keys.
+
+EXTRACTION_PROFILES = ("default", "fast", "accurate")
+FAST_TEXT_FLAGS = pymupdf.TEXT_MEDIABOX_CLIP
+ACCURATE_TEXT_FLAGS = pymupdf.TEXTFLAGS_BLOCKS | pymupdf.TEXT_DEHYPHENATE
+STANDARD_EXTRACTION_PROFILES = {}  # standard -> profile, for standards whose filings need another than "default"
+
+def profile_for(standard, extraction_profile=None):
+    """The profile to extract with: the one asked for, else the standard's (shared by all, for a list)."""
+    if extraction_profile:
+        return extraction_profile
+    standards = standard if isinstance(standard, list) else [standard]
+    profiles = {STANDARD_EXTRACTION_PROFILES.get(name, "default") for name in standards}
+    return profiles.pop() if len(profiles) == 1 else "default"
+
+def page_text(page, profile="default"):
+    """The text of one page with an extraction profile."""
+    if profile == "fast":
+        return page.get_textpage(flags=FAST_TEXT_FLAGS).extractText()
+    if profile == "accurate":
+        blocks = page.get_text("blocks", flags=ACCURATE_TEXT_FLAGS, sort=True)
+        return "\n".join(block[4] for block in blocks if block[6] == 0)  # text blocks only
+    return page.get_text("text")
+
+def open_pdf(pdf_path, pdf_bytes=None, pdf_document=None):
+    """Open a PDF from its path, or from its bytes when they are already in memory.
+
+    An already open pdf_document is used as is, and left open for its owner to close.
+    """
+    if pdf_document is not None:
+        return contextlib.nullcontext(pdf_document)
+    return pymupdf.open(pdf_path) if pdf_bytes is None else pymupdf.open(stream=pdf_bytes, filetype="pdf")
+
+def iter_page_texts(pdf_path, raise_errors=False, metrics=None, profile="default", pdf_bytes=None, pdf_document=None):
+    """Yield the raw text of each page; errors are logged and end the stream early (or are re-raised).
+
+    With metrics, opening the document and extracting the pages are timed as the "open" and
+    "extract" stages. With pdf_bytes, the PDF is read from memory and pdf_path only names it;
+    with pdf_document, the pages are read from that open pymupdf.Document.
+    """
+    try:
+        logging.info(f"Extracting text from PDF file: {pdf_path}")
+        # Open the PDF file using PyMuPDF
+        started = time.perf_counter()
+        with open_pdf(pdf_path, pdf_bytes, pdf_document) as doc:
+            if metrics is not None:
+                metrics.add_time("open", time.perf_counter() - started)
+            # Iterate through all pages and extract text
+            for page_num in range(len(doc)):
+                logging.debug(f"Extracting text from page {page_num + 1}")
+                if metrics is None:
+                    yield page_text(doc.load_page(page_num), profile)
+                    continue
+                started = time.perf_counter()
+                text = page_text(doc.load_page(page_num), profile)
+                metrics.add_time("extract", time.perf_counter() - started)
+                yield text
+        logging.info("Finished extracting text from PDF")
+    except FileNotFoundError:
+        # Handle case where the file is not found
+        logging.error(f"File not found: {pdf_path}")
+        if raise_errors:
+            raise
+    except PermissionError:
+        # Handle case where the file cannot be accessed due to permission issues
+        logging.error(f"Permission denied: {pdf_path}")
+        if raise_errors:
+            raise
+    except Exception as e:
+        # Handle any other exceptions that may occur
+        logging.error(f"Error extracting text from PDF: {e}")
+        if raise_errors:
+            raise
+
+def extract_text_from_pdf(pdf_path, cache_dir=None, cache_size_mb=None, text_store_dir=None, extraction_profile="default"):
+    """The whitespace-normalized text of a PDF (see normalize_text()), whether it is extracted, cached or stored.
+
+    The text store only keeps whitespace-collapsed pages, so the text is normalized whatever its source.
+    """
+    if text_store_dir:
+        try:
+            page_texts = stored_page_texts(pdf_path, text_store_dir, profile=extraction_profile)
+            return "".join(normalize_pages(page_texts))
+        except Exception as e:
+            logging.error(f"Error extracting text from PDF: {e}")
+            return ""
+    if cache_dir:
+        page_texts = cached_page_texts(pdf_path, cache_dir, cache_size_mb, profile=extraction_profile)
+    else:
+        page_texts = iter_page_texts(pdf_path, profile=extraction_profile)
+    # Join the pages once instead of growing a string page by page
+    return "".join(normalize_pages(page_texts))
+
+WHITESPACE = re.compile(r'\s+')
+
+def collapse_whitespace(page_text):
+    """Collapse the whitespace runs of one page to single spaces (the page form normalize_pages() expects)."""
+    return WHITESPACE.sub(' ', page_text)
+
+def normalize_text(text):
+    """Collapse all whitespace runs to single spaces."""
+    return WHITESPACE.sub(' ', text).strip()
+
+def normalize_pages(page_texts, metrics=None, page_starts=None):
+    """Yield normalized page chunks whose concatenation equals normalize_text() of the joined pages.
+
+    A whitespace run that spans a page break collapses to a single space, and leading and
+    trailing whitespace of the whole document is dropped, exactly as with the joined text.
+    With metrics, pages are counted and the normalization is timed as the "normalize" stage.
+    With a page_starts list, the offset where each non-empty page's text begins in the joined
+    chunks is appended to it as (offset, page number).
+    """
+    started = False  # a non-empty chunk has been yielded
+    pending_space = False  # the text so far ends with whitespace that has not been emitted yet
+    offset = 0
+    for page_number, page_text in enumerate(page_texts, start=1):
+        if metrics is None:
+            chunk = WHITESPACE.sub(' ', page_text)
+        else:
+            normalize_started = time.perf_counter()
+            chunk = WHITESPACE.sub(' ', page_text)
+            metrics.add_time("normalize", time.perf_counter() - normalize_started)
+            metrics.pages += 1
+        core = chunk.strip(' ')
+        if not core:
+            pending_space = pending_space or bool(chunk)
+            continue
+        if started and (pending_space or chunk[0] == ' '):
+            core = ' ' + core
+        if page_starts is not None:
+            page_starts.append((offset + (core[0] == ' '), page_number))
+            offset += len(core)
+        started = True
+        pending_space = chunk[-1] == ' '
+        yield core
+
+# Page-range parallelism for very large documents
+
+DEFAULT_SPLIT_PAGES = 500  # documents with more pages are extracted in parallel page ranges
+# Smaller files are not opened to count their pages: a page with any text to extract takes more
+# than this, and a file of near-empty pages is quick to extract in one piece anyway
+MIN_BYTES_PER_PAGE = 512
+
+def count_pages(pdf_path):
+    """Number of pages in the PDF, or 0 if it cannot be opened."""
+    try:
+        with pymupdf.open(pdf_path) as doc:
+            return len(doc)
+    except Exception:
+        return 0
+
+def split_page_ranges(page_count, parts):
+    """Split range(page_count) into at most `parts` contiguous (start, stop) ranges."""
+    pages_per_part = -(-page_count // parts)  # ceiling division
+    return [(start, min(start + pages_per_part, page_count)) for start in range(0, page_count, pages_per_part)]
+
+def extract_page_range(pdf_path, start, stop, profile="default"):
+    """Worker task: open the PDF independently and return the whitespace-collapsed text of a page range."""
+    logging.debug(f"Extracting pages {start + 1}-{stop} of {pdf_path}")
+    with pymupdf.open(pdf_path) as doc:
+        return [WHITESPACE.sub(' ', page_text(doc.load_page(page_num), profile)) for page_num in range(start, stop)]
+
+# Step 2: Extract sections based on precompiled patterns
+
+def extract_section(text, patterns, step_name):
+    all_matches = []
+    for pattern in patterns:
+        # Use the precompiled regex to find all matches for the given pattern
+        matches = list(pattern.finditer(text))
+        if matches:
+            logging.debug(f"Matches found with pattern '{pattern.pattern}': {[match.group() for match in matches]}")
+        all_matches.extend(match.group() for match in matches)
+    if all_matches:
+        # Return all matched text with the step name
+        return f"{step_name}: {'; '.join(all_matches)}"
+    return None  # Return None if no match is found
+
+# Step 3: Parse and summarize key information for a standard
+
+def format_summary(compiled_steps, scanner, pattern_matches, max_per_step=None):
+    """Build the "<step>: a; b" summary lines from the matches of every pattern.
+
+    With max_per_step, each step lists only its first matches in document order.
+    """
+    step_matches = [[] for _ in compiled_steps]
+    for (step_index, pattern), matches in zip(scanner["patterns"], pattern_matches):
+        if matches:
+            logging.debug(f"Matches found with pattern '{pattern.pattern}': {[match[2] for match in matches]}")
+        step_matches[step_index].extend(matches)
+    if max_per_step:
+        step_matches = [sorted(matches)[:max_per_step] for matches in step_matches]
+    step_matches = [[match[2] for match in matches] for matches in step_matches]
+    summary = []
+    for (step_name, description, patterns), matches in zip(compiled_steps, step_matches):
+        if matches:
+            # Return all matched text with the step name
+            summary.append(f"{step_name}: {'; '.join(matches)}")
+        else:
+            summary.append(f"{description}: Not Found")
+    return "\n".join(summary)  # Join all steps into a single summary string
+
+def summarize(text, standard, match_window=None, max_matches_per_step=None):
+    """Summarize normalized document text against every step of the given standard in a single pass."""
+    compiled_steps, scanner = get_compiled_standard(standard, match_window)
+    return format_summary(compiled_steps, scanner, scan(text, scanner), max_matches_per_step)
+
+def summarize_chunks(chunks, standard, match_window=None, metrics=None, max_matches_per_step=None):
+    """Summarize a stream of normalized text chunks; return None if the stream has no text.
+
+    With a match window every pattern has a bounded length, so the stream is matched incrementally
+    and memory stays flat; without one the chunks are joined into a single text first.
+    With max_matches_per_step each step lists at most that many matches, and with a match window
+    the stream is no longer read once every step has them.
+    With metrics, the characters, the matches per step and the time per step are recorded.
+    """
+    matched = match_chunks(chunks, standard, match_window, metrics, max_matches_per_step)
+    return None if matched is None else format_summary(*matched, max_matches_per_step)
+
+def match_records(chunks, standard, match_window=None, metrics=None, page_starts=None, max_matches_per_step=None):
+    """Like summarize_chunks(), but return the structured matches of every step (see format_records())."""
+    matched = match_chunks(chunks, standard, match_window, metrics, max_matches_per_step)
+    return None if matched is None else format_records(*matched, page_starts or [], max_matches_per_step)
+
+def format_records(compiled_steps, scanner, pattern_matches, page_starts, max_per_step=None):
+    """List every step with its matches as {"text", "start", "end", "page"} in document order.
+
+    Offsets are into the whitespace-normalized text; page is the 1-based page a match starts on.
+    With max_per_step, only the first matches of each step are listed.
+    """
+    step_matches = [[] for _ in compiled_steps]
+    for (step_index, pattern), matches in zip(scanner["patterns"], pattern_matches):
+        step_matches[step_index].extend(matches)
+    page_offsets = [offset for offset, _ in page_starts]
+    steps = []
+    for (step_name, description, patterns), matches in zip(compiled_steps, step_matches):
+        records = []
+        for start, end, text in sorted(matches)[:max_per_step]:
+            page_index = bisect.bisect_right(page_offsets, start) - 1
+            records.append({"text": text, "start": start, "end": end,
+                            "page": page_starts[page_index][1] if page_index >= 0 else None})
+        steps.append({"step": step_name, "description": description, "matches": records})
+    return steps
+
+def match_chunks(chunks, standard, match_window=None, metrics=None, max_matches_per_step=None):
+    """Scan a stream of normalized text chunks; return (compiled steps, scanner, matches), or None without text."""
+    compiled_steps, scanner = get_compiled_standard(standard, match_window)
+    pattern_matches, text_length = scan_chunks(chunks, scanner, metrics, max_matches_per_step)
+    if metrics is not None:
+        metrics.characters = text_length
+        for (step_index, pattern), matches, seconds in zip(scanner["patterns"], pattern_matches, metrics.pattern_seconds):
+            step_name = compiled_steps[step_index][0]
+            metrics.step_matches[step_name] = metrics.step_matches.get(step_name, 0) + len(matches)
+            metrics.step_seconds[step_name] = metrics.step_seconds.get(step_name, 0.0) + seconds
+    if not text_length:
+        return None
+    return compiled_steps, scanner, pattern_matches
+
+def summarize_per_pattern(text, standard, match_window=None):
+    """Reference implementation of summarize() that walks the text once per pattern."""
+    summary = []
+    compiled_steps, scanner = get_compiled_standard(standard, match_window)
+    for step_name, description, patterns in compiled_steps:
+        result = extract_section(text, patterns, step_name)
+        if result:
+            summary.append(result)
+        else:
+            summary.append(f"{description}: Not Found")
+    return "\n".join(summary)
+
+# Cache lookups
+
+DEFAULT_CACHE_SIZE_MB = text_cache.DEFAULT_MAX_BYTES // (1024 * 1024)
+
+def open_cache(cache_dir, cache_size_mb=None):
+    return text_cache.open_cache(cache_dir, (cache_size_mb or DEFAULT_CACHE_SIZE_MB) * 1024 * 1024)
+
+def summary_variant(standard, match_window=None, output_format="txt", max_matches_per_step=None,
+                    extraction_profile="default"):
+    """Identify a standard's current patterns, matching mode and output format, so edited patterns miss the cache."""
+    fingerprint = hashlib.sha256(json.dumps(STANDARDS[standard], sort_keys=True).encode('utf-8')).hexdigest()[:16]
+    variant = f"{standard}-{fingerprint}-window-{match_window}"
+    if max_matches_per_step:
+        variant = f"{variant}-max-{max_matches_per_step}"
+    if extraction_profile != "default":
+        variant = f"{variant}-{extraction_profile}"
+    return variant if output_format == "txt" else f"{variant}-{output_format}"
+
+def cached_page_texts(pdf_path, cache_dir, cache_size_mb=None, document=None, metrics=None, profile="default",
+                      pdf_bytes=None, pdf_document=None):
+    """Page texts from the cache; on a miss, extract them as they are read and cache them once all are read."""
+    cache = open_cache(cache_dir, cache_size_mb)
+    document = document or text_cache.document_key(pdf_path, profile, pdf_bytes)
+    page_texts = cache.get_pages(document)
+    if page_texts is not None:
+        logging.info(f"Using cached text for PDF: {pdf_path}")
+        if metrics is not None:
+            metrics.cached = "pages"
+        return page_texts
+    return caching_page_texts(cache, document, iter_page_texts(pdf_path, raise_errors=True, metrics=metrics,
+                                                               profile=profile, pdf_bytes=pdf_bytes,
+                                                               pdf_document=pdf_document))
+
+def caching_page_texts(cache, document, page_texts):
+    """Pass extracted pages through, and cache them once the last one is read.
+
+    Extraction is not run ahead of matching, so a scan that stops early (see scan_chunks()) still
+    stops extracting; the pages are then not cached, as a partial extraction never is. An
+    extraction error ends the pages early, as with iter_page_texts().
+    """
+    extracted = []
+    try:
+        for page_text in page_texts:
+            extracted.append(page_text)
+            yield page_text
+    except Exception:
+        return  # already logged
+    cache.put_pages(document, extracted)
+
+def stored_page_texts(pdf_path, text_store_dir, page_texts=None, metrics=None, document=None, profile="default",
+                      pdf_bytes=None, pdf_document=None):
+    """Page texts from the text store; on a miss, extract them (or take page_texts) and store them as they stream."""
+    store = text_store.open_store(text_store_dir)
+    document = document or text_cache.document_key(pdf_path, profile, pdf_bytes)
+    if store.has(document):
+        logging.info(f"Using stored text for PDF: {pdf_path}")
+        if metrics is not None:
+            metrics.cached = "store"
+        return store.read_pages(document)
+    if page_texts is None:
+        page_texts = iter_page_texts(pdf_path, raise_errors=True, metrics=metrics, profile=profile, pdf_bytes=pdf_bytes,
+                                     pdf_document=pdf_document)
+    return store.capture(document, pdf_path, page_texts, collapse_whitespace)
+
+def is_cached(pdf_path, standard, match_window=None, cache_dir=None, cache_size_mb=None, output_format="txt",
+              text_store_dir=None, max_matches_per_step=None, extraction_profile=None, **options):
+    """True if the PDF's summary or text is already in the cache or the text store."""
+    if not cache_dir and not text_store_dir:
+        return False
+    profile = profile_for(standard, extraction_profile)
+    try:
+        document = text_cache.document_key(pdf_path, profile)
+    except OSError:
+        return False
+    if text_store_dir and text_store.open_store(text_store_dir).has(document):
+        return True
+    if not cache_dir:
+        return False
+    cache = open_cache(cache_dir, cache_size_mb)
+    variant = summary_variant(standard, match_window, output_format, max_matches_per_step, profile)
+    return (cache.get_summary(document, variant) is not None
+            or cache.get_pages(document) is not None)
+
+# Step 4: Process PDF files
+
+def process_pdf(pdf_path, standard, output_directory="output_files", *, match_window=None, page_texts=None,
+                cache_dir=None, cache_size_mb=None, metrics_dir=None, output_format="txt", text_store_dir=None,
+                max_matches_per_step=None, extraction_profile=None, pdf_bytes=None, pdf_document=None, document=None):
+    """Parse one PDF and write its summary; report its status ("success", "skipped" or "failed").
+
+    page_texts can supply pages that were already extracted (e.g. by page-range workers), in order.
+    pdf_bytes can supply the PDF itself (e.g. an upload held in memory); pdf_path then only names
+    the document and its summary. pdf_document can supply it already opened (e.g. after checking
+    it), so it is not parsed twice. document can give its cache key (text_cache.document_key()) when
+    the caller already has it, so the file is not hashed again.
+    With a cache_dir, a cached summary is reused as is, and cached page text skips extraction.
+    With a text_store_dir, stored text skips extraction, and newly extracted text is stored.
+    With max_matches_per_step, each step keeps its first matches only; with a match window, pages
+    are no longer extracted once every step has them (see scan_chunks()).
+    extraction_profile picks one of EXTRACTION_PROFILES (default: the standard's, see profile_for()).
+    With a metrics_dir, the document's stage timers and counters are appended to its JSON lines
+    file and returned in the status dict under "metrics".
+    With output_format "jsonl" nothing is written: the structured record of the document is
+    returned under "record", for directory_runs.process_directory() to append to the shared results file.
+    """
+    document_metrics = metrics.DocumentMetrics(standard, pdf_path) if metrics_dir else None
+    result = parse_pdf(pdf_path, standard, output_directory, match_window=match_window, page_texts=page_texts,
+                       cache_dir=cache_dir, cache_size_mb=cache_size_mb, document_metrics=document_metrics,
+                       output_format=output_format, text_store_dir=text_store_dir,
+                       max_matches_per_step=max_matches_per_step, profile=profile_for(standard, extraction_profile),
+                       pdf_bytes=pdf_bytes, pdf_document=pdf_document, document=document)
+    if document_metrics is not None:
+        result["metrics"] = document_metrics.record(result["status"])
+        metrics.write_record(metrics_dir, result["metrics"])
+    return result
+
+def parse_pdf(pdf_path, standard, output_directory, *, match_window=None, page_texts=None, cache_dir=None,
+              cache_size_mb=None, document_metrics=None, output_format="txt", text_store_dir=None,
+              max_matches_per_step=None, profile="default", pdf_bytes=None, pdf_document=None, document=None):
+    """The work of process_pdf(); document_metrics is a metrics.DocumentMetrics or None."""
+    pdf_file = os.path.basename(pdf_path)
+    output_path = os.path.join(output_directory, f"{os.path.splitext(pdf_file)[0]}.txt")
+    try:
+        logging.info(f"Starting process for PDF: {pdf_path}")
+        summary = None  # the .txt summary, or the JSON of the steps and their matches
+        if cache_dir:
+            cache = open_cache(cache_dir, cache_size_mb)
+            document = document or text_cache.document_key(pdf_path, profile, pdf_bytes)
+            variant = summary_variant(standard, match_window, output_format, max_matches_per_step, profile)
+            summary = cache.get_summary(document, variant)
+            if summary is not None:
+                logging.info(f"Using cached summary for PDF: {pdf_path}")
+                if document_metrics is not None:
+                    document_metrics.cached = "summary"
+        if summary is None and text_store_dir:
+            document = document or text_cache.document_key(pdf_path, profile, pdf_bytes)
+            page_texts = stored_page_texts(pdf_path, text_store_dir, page_texts, metrics=document_metrics,
+                                           document=document, profile=profile, pdf_bytes=pdf_bytes,
+                                           pdf_document=pdf_document)
+        elif summary is None and cache_dir:
+            if page_texts is None:
+                page_texts = cached_page_texts(pdf_path, cache_dir, cache_size_mb, document=document,
+                                               metrics=document_metrics, profile=profile, pdf_bytes=pdf_bytes,
+                                               pdf_document=pdf_document)
+            else:
+                page_texts = list(page_texts)
+                if not cache.has_pages(document):
+                    cache.put_pages(document, page_texts)
+        if summary is None:
+            # Stream pages through whitespace normalization into the matcher
+            if page_texts is None:
+                page_texts = iter_page_texts(pdf_path, metrics=document_metrics, profile=profile, pdf_bytes=pdf_bytes,
+                                             pdf_document=pdf_document)
+            if output_format == "jsonl":
+                page_starts = []
+                chunks = normalize_pages(page_texts, document_metrics, page_starts)
+                steps = match_records(chunks, standard, match_window, document_metrics, page_starts, max_matches_per_step)
+                summary = None if steps is None else json.dumps(steps, ensure_ascii=False)
+            else:
+                chunks = normalize_pages(page_texts, document_metrics)
+                summary = summarize_chunks(chunks, standard, match_window, document_metrics, max_matches_per_step)
+            if text_store_dir and not text_store.open_store(text_store_dir).has(document):
+                # The scan stopped early: read the remaining pages too, so the store keeps the whole text
+                for _ in page_texts:
+                    pass
+            if summary is None:  # Add a check for empty or invalid text earlier in the workflow
+                logging.error("No valid text extracted from PDF. Skipping.")
+                return {"status": "skipped", "output": None, "error": "No valid text extracted"}
+            if cache_dir:
+                cache.put_summary(document, variant, summary)
+        if output_format == "jsonl":
+            record = {"pdf": pdf_file, "standard": standard, "status": "success", "steps": json.loads(summary)}
+            return {"status": "success", "output": None, "error": None, "record": record}
+        # Write the summary to a text file
+        started = time.perf_counter()
+        with open(output_path, 'w', encoding='utf-8') as output_file:
+            output_file.write(summary)
+        if document_metrics is not None:
+            document_metrics.add_time("write", time.perf_counter() - started)
+        logging.info(f"Summary written to: {output_path}")
+        return {"status": "success", "output": output_path, "error": None}
+    except FileNotFoundError:
+        logging.error(f"File not found: {pdf_path}")
+        return {"status": "failed", "output": None, "error": "File not found"}
+    except PermissionError:
+        logging.error(f"Permission denied: {pdf_path}")
+        return {"status": "failed", "output": None, "error": "Permission denied"}
+    except Exception as e:
+        logging.error(f"An unexpected error occurred: {e}")
+        return {"status": "failed", "output": None, "error": str(e)}
+
+def standard_output_directory(output_directory, standard, output_format="txt"):
+    """Where a standard's summaries and manifests go: output_directory/<standard>/; JSONL records all go to one file.
+
+    A PDF can sit in the folders of several standards (e.g. after auto routing), so each standard
+    keeps its summaries apart instead of all writing output_directory/<name>.txt.
+    """
+    return output_directory if output_format == "jsonl" else os.path.join(output_directory, standard)
+
+def process_pdf_standards(pdf_path, standards, output_directory="output_files", *, page_texts=None, cache_dir=None,
+                          cache_size_mb=None, text_store_dir=None, output_format="txt", extraction_profile=None,
+                          **options):
+    """Parse one PDF against several standards from a single extraction; return a status dict per standard.
+
+    The pages are extracted (or read from the text store or the cache) once, then matched against
+    each standard in turn, all with the same extraction profile (see profile_for()). Summaries are written to output_directory/<standard>/; with
+    output_format "jsonl" every standard's record is returned as by process_pdf().
+    """
+    profile = profile_for(standards, extraction_profile)
+    try:
+        # Hash the file once for the text store, the page cache and every standard's summary
+        document = text_cache.document_key(pdf_path, profile) if cache_dir or text_store_dir else None
+        if text_store_dir:
+            page_texts = list(stored_page_texts(pdf_path, text_store_dir, page_texts, document=document, profile=profile))
+        elif cache_dir and page_texts is None:
+            page_texts = list(cached_page_texts(pdf_path, cache_dir, cache_size_mb, document=document, profile=profile))
+        elif page_texts is None:
+            page_texts = list(iter_page_texts(pdf_path, profile=profile))
+        else:
+            page_texts = list(page_texts)
+    except Exception as e:
+        logging.error(f"An unexpected error occurred: {e}")
+        return failure(standards, str(e))
+    results = {}
+    for standard in standards:
+        standard_output = standard_output_directory(output_directory, standard, output_format)
+        os.makedirs(standard_output, exist_ok=True)
+        results[standard] = process_pdf(pdf_path, standard, standard_output, page_texts=page_texts, cache_dir=cache_dir,
+                                        cache_size_mb=cache_size_mb, output_format=output_format,
+                                        extraction_profile=profile, document=document, **options)
+    return results
+
+def failure(standard, error):
+    """The status dict of a file that could not be parsed; one per standard for a list of standards."""
+    if isinstance(standard, list):
+        return {name: failure(name, error) for name in standard}
+    return {"status": "failed", "output": None, "error": error}
+
+def file_size(path):
+    """Size of a file in bytes, or 0 if it cannot be read."""
+    try:
+        return os.path.getsize(path)
+    except OSError:
+        return 0
+
+def parse_files(pdf_paths, standard, output_directory, workers=None, split_pages=DEFAULT_SPLIT_PAGES, executor=None,
+                on_result=None, **options):
+    """Parse the given PDFs (largest first) and return a status dict per file.
+
+    standard can also be a list of standards: each file is then extracted once and parsed by
+    process_pdf_standards(), and its result is a status dict per standard.
+
+    With more than one worker the files are spread across a process pool, largest first so a
+    huge filing does not start last, and each summary is written as soon as its file finishes.
+    PDFs with more than split_pages pages are also split into page ranges extracted by several
+    workers; the ranges are merged in page order and matched once all of them are done.
+    executor can supply a long-lived pool (e.g. the watch daemon's warm workers) to use instead.
+    on_result(pdf_file, result) is called in this process as each file finishes.
+    Other keyword options (match_window, cache_dir, ...) are passed on to process_pdf().
+    """
+    results = {}
+    if not pdf_paths:
+        return results
+    parse = process_pdf_standards if isinstance(standard, list) else process_pdf
+    standards = standard if isinstance(standard, list) else [standard]
+    # Page ranges would extract every page up front, when matching may only need the first ones
+    stops_early = bool(options.get("max_matches_per_step") and options.get("match_window"))
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 and executor is None:
+        # Iterate through each PDF file and process it
+        for pdf_path in pdf_paths:
+            pdf_file = os.path.basename(pdf_path)
+            results[pdf_file] = parse(pdf_path, standard, output_directory, **options)
+            if on_result:
+                on_result(pdf_file, results[pdf_file])
+        return results
+
+    # Plan the work: whole documents, or page ranges for documents above the split threshold
+    page_ranges = {}
+    task_count = 0
+    for pdf_path in pdf_paths:
+        # Only files large enough to have more than split_pages pages are opened here to count them
+        could_split = workers > 1 and not stops_early and file_size(pdf_path) > split_pages * MIN_BYTES_PER_PAGE
+        page_count = count_pages(pdf_path) if could_split else 0
+        # Only large documents are split, so only they are hashed here to check the cache
+        if (could_split and page_count > split_pages
+                and not any(is_cached(pdf_path, name, **options) for name in standards)):
+            page_ranges[pdf_path] = split_page_ranges(page_count, workers)
+            logging.info(f"Splitting {pdf_path} ({page_count} pages) into {len(page_ranges[pdf_path])} page ranges")
+        task_count += len(page_ranges.get(pdf_path, [None]))
+
+    if executor is not None:
+        logging.info(f"Processing {len(pdf_paths)} PDF files with the running worker processes")
+        return run_parse_tasks(executor, pdf_paths, page_ranges, standard, output_directory, on_result, options)
+    workers = min(workers, task_count)
+    logging.info(f"Processing {len(pdf_paths)} PDF files with {workers} worker processes")
+    with ProcessPoolExecutor(max_workers=workers, initializer=configure_worker_logging,
+                             initargs=(logging.getLogger().level,)) as executor:
+        return run_parse_tasks(executor, pdf_paths, page_ranges, standard, output_directory, on_result, options)
+
+def run_parse_tasks(executor, pdf_paths, page_ranges, standard, output_directory, on_result, options):
+    """Submit whole documents and page ranges to the pool and collect a status dict per file."""
+    results = {}
+    parse = process_pdf_standards if isinstance(standard, list) else process_pdf
+
+    def finish(pdf_file, result):
+        results[pdf_file] = result
+        if on_result:
+            on_result(pdf_file, result)
+
+    profile = profile_for(standard, options.get("extraction_profile"))
+    futures = {}
+    for pdf_path in pdf_paths:
+        if pdf_path in page_ranges:
+            for index, (start, stop) in enumerate(page_ranges[pdf_path]):
+                futures[executor.submit(extract_page_range, pdf_path, start, stop, profile)] = (pdf_path, index)
+        else:
+            futures[executor.submit(parse, pdf_path, standard, output_directory, **options)] = (pdf_path, None)
+    extracted_ranges = {pdf_path: {} for pdf_path in page_ranges}
+    for future in as_completed(futures):
+        pdf_path, range_index = futures[future]
+        pdf_file = os.path.basename(pdf_path)
+        if pdf_file in results:
+            continue  # an earlier page range of this document already failed
+        try:
+            result = future.result()
+        except Exception as e:
+            # process_pdf handles its own errors, so this is a failed page range or a dead worker
+            logging.error(f"Worker failed while processing {pdf_file}: {e}")
+            finish(pdf_file, failure(standard, str(e)))
+            continue
+        if range_index is None:
+            finish(pdf_file, result)
+            continue
+        extracted_ranges[pdf_path][range_index] = result
+        if len(extracted_ranges[pdf_path]) == len(page_ranges[pdf_path]):
+            # All slices are in: merge them in page order and match the whole document
+            slices = extracted_ranges.pop(pdf_path)
+            page_texts = (page for index in range(len(slices)) for page in slices[index])
+            finish(pdf_file, parse(pdf_path, standard, output_directory, page_texts=page_texts, **options))
+    return results
@@ -0,0 +1,64 @@
+import logging
+import parsing_engine
+
+# Cheap validation of an incoming PDF before it is parsed. The website used to build a full
+# PyPDF2.PdfReader and count its pages: on a large or damaged file that walked the whole page tree
+# in pure Python, before PyMuPDF opened the same file again to extract it. Here the file's head and
+# tail are checked for the PDF header and the startxref/%%EOF trailer, then PyMuPDF opens it once
+# and only the encryption flag and the page count (read from the page tree root) are looked at.
+# The open document is handed on to extraction. Opening a damaged file can stall inside PyMuPDF's C
+# code, where no Python-level timer can interrupt it, so the time limit is enforced by the caller:
+# the website runs the check in a parser worker process and kills the worker if it overruns.
+
+HEADER_WINDOW = 1024  # the header may follow a little junk (the PDF specification allows 1024 bytes)
+TRAILER_WINDOW = 4096  # room for a trailer dictionary and trailing junk after %%EOF
+DEFAULT_TIME_LIMIT = 10  # seconds; enforced by the caller (see parser_pool)
+
+def read_ends(pdf_path, pdf_bytes=None):
+    """The first HEADER_WINDOW and last TRAILER_WINDOW bytes of a PDF, without reading the rest."""
+    if pdf_bytes is not None:
+        return bytes(pdf_bytes[:HEADER_WINDOW]), bytes(pdf_bytes[-TRAILER_WINDOW:])
+    with open(pdf_path, 'rb') as pdf_file:
+        head = pdf_file.read(HEADER_WINDOW)
+        pdf_file.seek(0, 2)
+        pdf_file.seek(max(pdf_file.tell() - TRAILER_WINDOW, 0))
+        return head, pdf_file.read()
+
+def structure_problem(head, tail):
+    """Why the ends of a file cannot be those of a PDF, or None if they can."""
+    if b"%PDF-" not in head:
+        return "No PDF header"
+    if b"startxref" not in tail or b"%%EOF" not in tail:
+        return "No cross-reference trailer (truncated file?)"
+    return None
+
+def document_problem(doc):
+    """Why an opened document cannot be parsed, or None if it can."""
+    if not doc.is_pdf:
+        return "Not a PDF document"
+    if doc.needs_pass:
+        return "The PDF is password-protected"
+    if doc.page_count == 0:
+        return "The PDF has no pages"
+    return None
+
+def open_checked(pdf_path, pdf_bytes=None):
+    """Check a PDF and open it; return (document, None), or (None, the reason it is invalid).
+
+    The caller closes the document, after passing it on to extraction (process_pdf's pdf_document).
+    """
+    doc = None
+    try:
+        problem = structure_problem(*read_ends(pdf_path, pdf_bytes))
+        if problem:
+            return None, problem
+        doc = parsing_engine.open_pdf(pdf_path, pdf_bytes)
+        problem = document_problem(doc)
+    except Exception as e:
+        problem = f"Cannot open the PDF: {e}"
+    if problem:
+        logging.warning(f"Invalid PDF {pdf_path}: {problem}")
+        if doc is not None:
+            doc.close()
+        return None, problem
+    return doc, None
@@ -0,0 +1,194 @@
+import os
+import shutil
+import logging
+import argparse
+import itertools
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import parsing_engine
+import directory_runs
+
+# Automatic routing of PDFs whose standard is not known (bulk ingest, or uploads to the wrong
+# form type). PDFs dropped into pdf_files_to_parse/auto/ are scored against the patterns of all
+# ten standards on their first pages only, then linked into pdf_files_to_parse/<standard>/ for
+# every standard that matches best, where the normal incremental runs (or the watch daemon)
+# parse them with the right parser.
+#
+# A standard's score is the fraction of its steps with at least one match, found with
+# sentence-bounded patterns so scoring a few pages stays cheap. The standards within --detect-margin
+# of the best score are chosen. When the best score is below --detect-min-score, or more than
+# --detect-max-standards are that close, the result is ambiguous: twice as many pages are read and
+# scored again, until the document ends. PDFs that match no standard go to
+# pdf_files_to_parse/unclassified/.
+
+AUTO = "auto"  # the --form_type and folder name of documents to route
+UNCLASSIFIED = "unclassified"
+DEFAULT_FIRST_PAGES = 3
+DEFAULT_MIN_SCORE = 0.4  # e.g. two of five steps
+DEFAULT_MARGIN = 0.2
+DEFAULT_MAX_STANDARDS = 2  # asc606 and ifrs15 share most of their vocabulary
+DETECTION_WINDOW = "sentence"
+DETECTION_PROFILE = "fast"  # ligatures and glyph codes do not change which standard matches
+
+def parse_form_types(value):
+    """argparse type for --form_type: the standards accepted by parsing_engine.parse_standards(), or "auto"."""
+    return [AUTO] if value == AUTO else parsing_engine.parse_standards(value)
+
+def unit_float(value):
+    """argparse type for scores between 0 and 1."""
+    try:
+        number = float(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid number: {value!r}")
+    if not 0 <= number <= 1:
+        raise argparse.ArgumentTypeError(f"must be between 0 and 1: {value!r}")
+    return number
+
+def add_detection_arguments(parser):
+    """Add the options of --form_type auto to the p2ta entry points."""
+    parser.add_argument('--detect-pages', type=parsing_engine.positive_int, default=DEFAULT_FIRST_PAGES,
+                        help=f"With --form_type auto, score the standards on this many first pages (default: {DEFAULT_FIRST_PAGES})")
+    parser.add_argument('--detect-min-score', type=unit_float, default=DEFAULT_MIN_SCORE,
+                        help="Fraction of a standard's steps that must match for it to be chosen "
+                             f"(default: {DEFAULT_MIN_SCORE})")
+    parser.add_argument('--detect-margin', type=unit_float, default=DEFAULT_MARGIN,
+                        help=f"Also route to standards this close to the best score (default: {DEFAULT_MARGIN})")
+    parser.add_argument('--detect-max-standards', type=parsing_engine.positive_int, default=DEFAULT_MAX_STANDARDS,
+                        help="Read further pages while more standards than this are tied "
+                             f"(default: {DEFAULT_MAX_STANDARDS})")
+    return parser
+
+def detection_options(args):
+    """Keyword arguments for route_folder() taken from the parsed command line."""
+    return {
+        "first_pages": args.detect_pages,
+        "min_score": args.detect_min_score,
+        "margin": args.detect_margin,
+        "max_standards": args.detect_max_standards,
+    }
+
+def score_pages(page_texts, standards=None):
+    """Fraction of each standard's steps with at least one match in the pages."""
+    chunks = list(parsing_engine.normalize_pages(page_texts))
+    scores = {}
+    for standard in standards or parsing_engine.STANDARDS:
+        matched = parsing_engine.match_chunks(iter(chunks), standard, DETECTION_WINDOW)
+        if matched is None:
+            scores[standard] = 0.0
+            continue
+        compiled_steps, scanner, pattern_matches = matched
+        steps_found = {step_index for (step_index, _), matches in zip(scanner["patterns"], pattern_matches) if matches}
+        scores[standard] = len(steps_found) / len(compiled_steps)
+    return scores
+
+def choose(scores, min_score=DEFAULT_MIN_SCORE, margin=DEFAULT_MARGIN):
+    """The standards within margin of the best score, best first; none if the best is below min_score."""
+    best = max(scores.values(), default=0.0)
+    if best < min_score:
+        return []
+    return sorted((standard for standard, score in scores.items() if score >= best - margin),
+                  key=lambda standard: scores[standard], reverse=True)
+
+def detect(pdf_path, first_pages=DEFAULT_FIRST_PAGES, min_score=DEFAULT_MIN_SCORE, margin=DEFAULT_MARGIN,
+           max_standards=DEFAULT_MAX_STANDARDS):
+    """Score the standards on the first pages of a PDF, reading further only while the result is ambiguous.
+
+    Return {"standards": the chosen standards, "scores": by standard, "pages": pages read}.
+    """
+    page_texts = parsing_engine.iter_page_texts(pdf_path, raise_errors=True, profile=DETECTION_PROFILE)
+    pages = []
+    limit = first_pages
+    try:
+        while True:
+            pages.extend(itertools.islice(page_texts, limit - len(pages)))
+            scores = score_pages(pages)
+            standards = choose(scores, min_score, margin)
+            if len(pages) < limit or (standards and len(standards) <= max_standards):
+                break
+            logging.debug(f"Standard of {pdf_path} is ambiguous after {len(pages)} pages, reading {limit} more")
+            limit *= 2
+    finally:
+        page_texts.close()
+    return {"standards": standards, "scores": scores, "pages": len(pages)}
+
+def link_into(pdf_path, folder):
+    """Hard-link (or copy) a PDF into a folder, replacing a file of the same name atomically."""
+    os.makedirs(folder, exist_ok=True)
+    target = os.path.join(folder, os.path.basename(pdf_path))
+    temporary_path = f"{target}.routing"
+    try:
+        os.link(pdf_path, temporary_path)
+    except OSError:
+        shutil.copy2(pdf_path, temporary_path)  # other file system, or no hard links
+    os.replace(temporary_path, target)
+    return target
+
+def place(pdf_path, pdf_root, standards):
+    """Move a PDF from the auto folder into the folder of each standard (or into the unclassified folder)."""
+    for folder in standards or [UNCLASSIFIED]:
+        target = link_into(pdf_path, os.path.join(pdf_root, folder))
+        logging.info(f"Routed {os.path.basename(pdf_path)} to {target}")
+    os.remove(pdf_path)
+
+def route_folder(pdf_directory=None, pdf_root="pdf_files_to_parse", workers=None, executor=None, **detect_options):
+    """Detect the standards of every PDF in the auto folder and move each into its standards' folders.
+
+    Return {pdf_file: detection} (see detect()); a PDF that cannot be read is moved to the
+    unclassified folder with an "error". executor can supply a running worker pool.
+    """
+    pdf_directory = pdf_directory or os.path.join(pdf_root, AUTO)
+    if not os.path.isdir(pdf_directory):
+        logging.error(f"Directory not found: {pdf_directory}")
+        return {}
+    _, pdf_paths = directory_runs.list_pdfs(pdf_directory)
+    if not pdf_paths:
+        return {}
+    detections = {}
+    workers = workers or os.cpu_count() or 1
+    own_executor = executor is None and workers > 1 and len(pdf_paths) > 1
+    if own_executor:
+        executor = ProcessPoolExecutor(max_workers=min(workers, len(pdf_paths)),
+                                       initializer=parsing_engine.configure_worker_logging,
+                                       initargs=(logging.getLogger().level,))
+    try:
+        if executor is None:
+            completed = ((pdf_path, run_detection(detect, pdf_path, **detect_options)) for pdf_path in pdf_paths)
+        else:
+            futures = {executor.submit(detect, pdf_path, **detect_options): pdf_path for pdf_path in pdf_paths}
+            completed = ((futures[future], run_detection(future.result)) for future in as_completed(futures))
+        for pdf_path, detection in completed:
+            pdf_file = os.path.basename(pdf_path)
+            detections[pdf_file] = detection
+            scores = ", ".join(f"{standard} {score:.2f}" for standard, score in detection["scores"].items() if score)
+            logging.info(f"Detected {', '.join(detection['standards']) or 'no standard'} for {pdf_file} "
+                         f"after {detection['pages']} pages ({scores or 'no matches'})")
+            try:
+                place(pdf_path, pdf_root, detection["standards"])
+            except OSError as e:
+                logging.error(f"Could not route {pdf_file}: {e}")
+                detection["error"] = str(e)
+    finally:
+        if own_executor:
+            executor.shutdown()
+    return detections
+
+def run_detection(function, *args, **kwargs):
+    """Call detect() (or a future's result()), turning a failure into an empty detection with an "error"."""
+    try:
+        return function(*args, **kwargs)
+    except Exception as e:
+        logging.error(f"Could not detect the standard: {e}")
+        return {"standards": [], "scores": {}, "pages": 0, "error": str(e)}
+
+def route_and_parse(args):
+    """--form_type auto: move the PDFs of the auto folder into the folders of the standards they match, then parse those folders."""
+    detections = route_folder(args.pdf_dir, "pdf_files_to_parse", workers=args.workers, **detection_options(args))
+    routed = {standard for detection in detections.values() for standard in detection["standards"]}
+    results = {}
+    for standard in (standard for standard in parsing_engine.STANDARDS if standard in routed):
+        results[standard] = directory_runs.process_directory(standard, os.path.join("pdf_files_to_parse", standard),
+                                                             "output_files", **parsing_engine.options_from_arguments(args))
+        directory_runs.log_results(standard, results[standard])
+    unclassified = sum(1 for detection in detections.values() if not detection["standards"])
+    logging.info(f"Routed {len(detections) - unclassified}/{len(detections)} PDF files to {len(routed)} form types "
+                 f"({unclassified} unclassified)")
+    return results
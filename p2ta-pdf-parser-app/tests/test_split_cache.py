@@ -0,0 +1,55 @@
+import os
+import sys
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+# Make the parser application's modules importable when run from anywhere
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pymupdf  # noqa: E402
+import parsing_engine  # noqa: E402
+import text_cache  # noqa: E402
+
+# A split parse with a cache: the parent opens the cache (is_cached()) before it forks the page
+# range workers, which must then open connections of their own instead of using the inherited one.
+
+PAGES = 12
+SPLIT_PAGES = 4
+
+def write_pdf(path, pages=PAGES):
+    with pymupdf.open() as doc:
+        for page_number in range(pages):
+            doc.new_page().insert_text((72, 72), f"Page {page_number + 1}: the contract with customer "
+                                                 f"sets the transaction price.")
+        doc.save(path)
+
+def connection_id(cache_dir):
+    return id(text_cache.open_cache(cache_dir).connection)
+
+def test_forked_worker_opens_its_own_cache_connection(tmp_path):
+    cache_dir = str(tmp_path / "cache")
+    inherited = connection_id(cache_dir)
+    with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("fork")) as executor:
+        assert executor.submit(connection_id, cache_dir).result() != inherited
+
+def test_split_parse_with_cache_dir(tmp_path):
+    pdf_path = str(tmp_path / "filing.pdf")
+    write_pdf(pdf_path)
+    cache_dir = str(tmp_path / "cache")
+    output_directory = str(tmp_path / "output")
+    os.makedirs(output_directory)
+    options = {"workers": 2, "split_pages": SPLIT_PAGES, "cache_dir": cache_dir}
+
+    results = parsing_engine.parse_files([pdf_path], "asc606", output_directory, **options)
+    assert results["filing.pdf"]["status"] == "success"
+    with open(results["filing.pdf"]["output"], encoding='utf-8') as output_file:
+        summary = output_file.read()
+    assert "contract with customer" in summary
+
+    # The pages and the summary were cached: the second run reuses them and writes the same summary
+    assert parsing_engine.is_cached(pdf_path, "asc606", cache_dir=cache_dir)
+    os.remove(results["filing.pdf"]["output"])
+    results = parsing_engine.parse_files([pdf_path], "asc606", output_directory, **options)
+    assert results["filing.pdf"]["status"] == "success"
+    with open(results["filing.pdf"]["output"], encoding='utf-8') as output_file:
+        assert output_file.read() == summary
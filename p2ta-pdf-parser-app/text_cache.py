@@ -0,0 +1,114 @@
+import os
+import json
+import time
+import zlib
+import hashlib
+import logging
+import sqlite3
+import pymupdf  # Import pymupdf from PyMuPDF
+
+# Persistent, content-addressed cache of extracted page text and per-standard summaries.
+# Entries are keyed by the SHA-256 of the PDF bytes plus the PyMuPDF version, so an unchanged
+# file is never decoded twice and upgrading PyMuPDF invalidates old extractions. The cache is a
+# single SQLite database; its total payload is capped and the least recently used entries are
+# evicted first.
+
+DEFAULT_MAX_BYTES = 1024 * 1024 * 1024  # 1 GiB
+HASH_BLOCK_SIZE = 1024 * 1024
+
+OPEN_CACHES = {}  # (process ID, cache directory) -> TextCache, one connection per process
+
+def file_sha256(path):
+    """Hex SHA-256 of a file's bytes, read in blocks."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as input_file:
+        for block in iter(lambda: input_file.read(HASH_BLOCK_SIZE), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+def document_key(pdf_path, profile="default", data=None):
+    """SHA-256 of the PDF bytes combined with the PyMuPDF version (and the extraction profile, if not the default).
+
+    data can supply the PDF's bytes when they are already in memory; the file is then not read.
+    """
+    digest = file_sha256(pdf_path) if data is None else hashlib.sha256(data).hexdigest()
+    key = f"{digest}-pymupdf{pymupdf.VersionBind}"
+    return key if profile == "default" else f"{key}-{profile}"
+
+def open_cache(cache_dir, max_bytes=DEFAULT_MAX_BYTES):
+    """Return the process-wide cache for a directory, opening it on first use.
+
+    Keyed by process ID too: a forked worker inherits the caches its parent opened, and SQLite
+    connections must not be used across a fork, so the worker opens its own.
+    """
+    key = (os.getpid(), cache_dir)
+    cache = OPEN_CACHES.get(key)
+    if cache is None:
+        cache = OPEN_CACHES[key] = TextCache(cache_dir, max_bytes)
+    cache.max_bytes = max_bytes
+    return cache
+
+class TextCache:
+    """SQLite-backed LRU store; safe to share between worker processes."""
+
+    def __init__(self, cache_dir, max_bytes=DEFAULT_MAX_BYTES):
+        os.makedirs(cache_dir, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.connection = sqlite3.connect(os.path.join(cache_dir, 'p2ta_cache.sqlite3'), timeout=60,
+                                          isolation_level=None)
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        self.connection.execute(
+            'CREATE TABLE IF NOT EXISTS entries ('
+            ' key TEXT PRIMARY KEY,'  # "<document key>" for pages, "<document key>|<variant>" for summaries
+            ' payload BLOB NOT NULL,'
+            ' size INTEGER NOT NULL,'
+            ' last_used REAL NOT NULL)'
+        )
+        self.connection.execute('CREATE INDEX IF NOT EXISTS entries_last_used ON entries (last_used)')
+
+    def get(self, key):
+        row = self.connection.execute('SELECT payload FROM entries WHERE key = ?', (key,)).fetchone()
+        if row is None:
+            return None
+        self.connection.execute('UPDATE entries SET last_used = ? WHERE key = ?', (time.time(), key))
+        return zlib.decompress(row[0]).decode('utf-8')
+
+    def put(self, key, value):
+        payload = zlib.compress(value.encode('utf-8'))
+        if len(payload) > self.max_bytes:
+            logging.debug(f"Not caching {key}: {len(payload)} bytes exceeds the cache size")
+            return
+        self.connection.execute('INSERT OR REPLACE INTO entries (key, payload, size, last_used) VALUES (?, ?, ?, ?)',
+                                (key, payload, len(payload), time.time()))
+        self.evict()
+
+    def evict(self):
+        """Drop least recently used entries until the payload fits in max_bytes."""
+        total = self.connection.execute('SELECT COALESCE(SUM(size), 0) FROM entries').fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        for key, size in self.connection.execute('SELECT key, size FROM entries ORDER BY last_used').fetchall():
+            self.connection.execute('DELETE FROM entries WHERE key = ?', (key,))
+            logging.debug(f"Evicted cache entry {key}")
+            total -= size
+            if total <= self.max_bytes:
+                break
+
+    def get_pages(self, document):
+        """Cached page texts of a document, or None."""
+        value = self.get(document)
+        return None if value is None else json.loads(value)
+
+    def has_pages(self, document):
+        """True if the page texts of a document are cached, without reading them."""
+        return self.connection.execute('SELECT 1 FROM entries WHERE key = ?', (document,)).fetchone() is not None
+
+    def put_pages(self, document, page_texts):
+        self.put(document, json.dumps(page_texts))
+
+    def get_summary(self, document, variant):
+        """Cached summary of a document for a standard/pattern variant, or None."""
+        return self.get(f"{document}|{variant}")
+
+    def put_summary(self, document, variant, summary):
+        self.put(f"{document}|{variant}", summary)
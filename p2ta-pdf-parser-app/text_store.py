@@ -0,0 +1,121 @@
+import os
+import json
+import mmap
+import zlib
+import struct
+import logging
+
+# Persistent store of extracted document text, so that changing a pattern only means re-matching
+# (see directory_runs.rescan_store) instead of decoding every PDF again with PyMuPDF.
+#
+# Each document is kept in its own file, named after its content key (SHA-256 of the PDF plus the
+# PyMuPDF version, see text_cache.document_key):
+#
+#   magic | zlib-compressed page texts ... | page table | footer
+#
+# Pages are stored whitespace-collapsed (the per-page form normalize_pages() consumes), so reading
+# them back gives exactly the summaries and page numbers a fresh extraction would. The page table
+# holds, per page, the offset of its text in the joined pages and where its compressed block lives;
+# the footer points at the table. Files are read through mmap, so a single page can be decompressed
+# without reading the rest. index.jsonl maps the PDF paths that were extracted to their keys.
+
+MAGIC = b'P2TATXT1'
+PAGE_ENTRY = struct.Struct('<QQI')  # text offset, block offset, block length
+FOOTER = struct.Struct('<QQI8s')  # table offset, characters, page count, magic
+INDEX_FILE = 'index.jsonl'
+
+OPEN_STORES = {}  # store directory -> TextStore
+
+def open_store(directory):
+    """Return the process-wide store for a directory, opening it on first use."""
+    store = OPEN_STORES.get(directory)
+    if store is None:
+        store = OPEN_STORES[directory] = TextStore(directory)
+    return store
+
+class TextStore:
+    """A directory of per-document text files plus an index of the PDFs they came from."""
+
+    def __init__(self, directory):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+
+    def path(self, key):
+        # Spread files over 256 subdirectories so large archives do not end up in one folder
+        return os.path.join(self.directory, key[:2], f"{key}.p2ts")
+
+    def has(self, key):
+        return os.path.exists(self.path(key))
+
+    def read_table(self, key):
+        """Return (page table, characters) of a stored document."""
+        with open(self.path(key), 'rb') as store_file, mmap.mmap(store_file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            table_offset, characters, page_count, magic = FOOTER.unpack_from(data, len(data) - FOOTER.size)
+            if magic != MAGIC:
+                raise ValueError(f"Not a text store file: {self.path(key)}")
+            table = [PAGE_ENTRY.unpack_from(data, table_offset + index * PAGE_ENTRY.size) for index in range(page_count)]
+        return table, characters
+
+    def page_offsets(self, key):
+        """Offset of every page's text in the joined pages."""
+        return [text_offset for text_offset, _, _ in self.read_table(key)[0]]
+
+    def read_pages(self, key):
+        """Yield the stored page texts of a document, decompressing one page at a time."""
+        table, _ = self.read_table(key)
+        with open(self.path(key), 'rb') as store_file, mmap.mmap(store_file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            for _, block_offset, block_length in table:
+                yield zlib.decompress(data[block_offset:block_offset + block_length]).decode('utf-8')
+
+    def capture(self, key, pdf_path, page_texts, collapse):
+        """Pass page texts through, collapsed with collapse(), and store them once the stream is complete.
+
+        The file is written next to its final name and only renamed into place at the end, so a
+        failed extraction never leaves a truncated document behind.
+        """
+        path = self.path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temporary_path = f"{path}.{os.getpid()}.tmp"
+        table = []
+        characters = 0
+        try:
+            with open(temporary_path, 'wb') as store_file:
+                store_file.write(MAGIC)
+                for page_text in page_texts:
+                    page_text = collapse(page_text)
+                    block = zlib.compress(page_text.encode('utf-8'))
+                    table.append((characters, store_file.tell(), len(block)))
+                    store_file.write(block)
+                    characters += len(page_text)
+                    yield page_text
+                table_offset = store_file.tell()
+                for entry in table:
+                    store_file.write(PAGE_ENTRY.pack(*entry))
+                store_file.write(FOOTER.pack(table_offset, characters, len(table), MAGIC))
+            os.replace(temporary_path, path)
+        finally:
+            if os.path.exists(temporary_path):
+                os.remove(temporary_path)
+        self.add_to_index(key, pdf_path, len(table), characters)
+        logging.debug(f"Stored text of {pdf_path} ({len(table)} pages) in {path}")
+
+    def add_to_index(self, key, pdf_path, pages, characters):
+        """Record which PDF a key came from (one appended line, so workers can share the index)."""
+        entry = {"key": key, "pdf": os.path.abspath(pdf_path), "pages": pages, "characters": characters}
+        with open(os.path.join(self.directory, INDEX_FILE), 'a', encoding='utf-8') as index_file:
+            index_file.write(json.dumps(entry) + "\n")
+
+    def documents(self):
+        """PDF path -> key of every stored document; the latest extraction of a path wins."""
+        documents = {}
+        try:
+            with open(os.path.join(self.directory, INDEX_FILE), 'r', encoding='utf-8') as index_file:
+                for line in index_file:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue  # a line cut short by a crash
+                    documents[entry["pdf"]] = entry["key"]
+        except FileNotFoundError:
+            return {}
+        return {pdf_path: key for pdf_path, key in documents.items() if self.has(key)}
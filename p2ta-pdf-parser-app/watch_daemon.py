@@ -0,0 +1,275 @@
+import os
+import time
+import errno
+import select
+import signal
+import struct
+import ctypes
+import logging
+import argparse
+import threading
+from concurrent.futures import ProcessPoolExecutor
+import parsing_engine
+import directory_runs
+import file_manifest
+import standard_detector
+
+# Long-running watch mode for the p2ta-pdf-parser container.
+# The daemon watches pdf_files_to_parse/<standard>/ with inotify (or by polling where inotify is
+# not available, e.g. on bind mounts from a macOS or Windows host) and, whenever a folder
+# changes, runs an incremental directory pass over it: new and changed PDFs are parsed, deleted
+# ones have their summaries removed (see file_manifest). The pool of worker processes is started
+# once, with PyMuPDF imported and the patterns compiled, so a file that lands is parsed at once.
+# PDFs that land in pdf_files_to_parse/auto/ are first routed to the folders of the standards
+# they match (see standard_detector), then parsed there.
+
+DEFAULT_POLL_INTERVAL = 0.5  # seconds between two folder scans in polling mode
+DEFAULT_RESCAN_INTERVAL = 60  # seconds without events after which every folder is checked anyway
+STOP_CHECK_INTERVAL = 1  # longest time between two checks of the stop flag
+
+# inotify(7) constants
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_CLOSE_WRITE = 0x00000008
+IN_DELETE_SELF = 0x00000400
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = os.O_NONBLOCK
+IN_CLOEXEC = os.O_CLOEXEC
+STANDARD_EVENTS = IN_CLOSE_WRITE | IN_MOVED_TO | IN_MOVED_FROM | IN_DELETE | IN_DELETE_SELF
+ROOT_EVENTS = IN_CREATE | IN_MOVED_TO
+EVENT_HEADER = struct.Struct('iIII')  # wd, mask, cookie, length of the name that follows
+
+def positive_float(value):
+    """argparse type for intervals in seconds."""
+    try:
+        number = float(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid number: {value!r}")
+    if number <= 0:
+        raise argparse.ArgumentTypeError(f"must be positive: {value!r}")
+    return number
+
+def add_watch_arguments(parser):
+    """Add the options of the watch daemon to the p2ta entry points."""
+    parser.add_argument('--watch', action='store_true',
+                        help="Keep running and parse PDFs as they land in pdf_files_to_parse/<form_type>/ "
+                             "(all form types unless --form_type is given)")
+    parser.add_argument('--poll', action='store_true',
+                        help="In watch mode, scan the folders periodically instead of using inotify")
+    parser.add_argument('--poll-interval', type=positive_float, default=DEFAULT_POLL_INTERVAL,
+                        help=f"Seconds between two folder scans in polling mode (default: {DEFAULT_POLL_INTERVAL})")
+    parser.add_argument('--rescan-interval', type=positive_float, default=DEFAULT_RESCAN_INTERVAL,
+                        help=f"In watch mode, check every folder after this many seconds without events (default: {DEFAULT_RESCAN_INTERVAL})")
+    return parser
+
+class InotifyWatcher:
+    """Reports the standards whose folder had a PDF written, moved or deleted, using inotify."""
+
+    def __init__(self, pdf_root, standards):
+        libc = ctypes.CDLL(None, use_errno=True)
+        self.add_watch = libc.inotify_add_watch
+        self.add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        self.fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), os.strerror(ctypes.get_errno()))
+        self.pdf_root = pdf_root
+        self.standards = standards
+        self.folders = {}  # watch descriptor -> standard
+        self.root = self.watch(pdf_root, ROOT_EVENTS)
+        for standard in standards:
+            self.watch_standard(standard)
+
+    def watch(self, path, mask):
+        wd = self.add_watch(self.fd, os.fsencode(path), mask)
+        if wd < 0:
+            raise OSError(ctypes.get_errno(), os.strerror(ctypes.get_errno()), path)
+        return wd
+
+    def watch_standard(self, standard):
+        folder = os.path.join(self.pdf_root, standard)
+        try:
+            self.folders[self.watch(folder, STANDARD_EVENTS)] = standard
+        except OSError as e:
+            if e.errno != errno.ENOENT:
+                raise
+            logging.debug(f"Not watching {folder} yet: it does not exist")
+
+    def wait(self, timeout, stop_event):
+        """Block until a folder changes, the timeout expires or stop_event is set; return the changed standards."""
+        deadline = time.monotonic() + timeout
+        while not stop_event.is_set():
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return set()
+            readable, _, _ = select.select([self.fd], [], [], min(remaining, STOP_CHECK_INTERVAL))
+            if readable:
+                changed = self.read_events()
+                if changed:
+                    return changed
+        return set()
+
+    def read_events(self):
+        changed = set()
+        while True:
+            try:
+                data = os.read(self.fd, 64 * 1024)
+            except BlockingIOError:
+                return changed
+            offset = 0
+            while offset < len(data):
+                wd, mask, _, length = EVENT_HEADER.unpack_from(data, offset)
+                name = os.fsdecode(data[offset + EVENT_HEADER.size:offset + EVENT_HEADER.size + length].rstrip(b'\0'))
+                offset += EVENT_HEADER.size + length
+                if mask & IN_Q_OVERFLOW:
+                    logging.warning("inotify event queue overflowed, checking every folder")
+                    changed.update(self.standards)
+                elif wd == self.root:
+                    if mask & IN_ISDIR and name in self.standards and name not in self.folders.values():
+                        self.watch_standard(name)
+                        changed.add(name)  # files may have landed before the watch was added
+                elif mask & IN_IGNORED:
+                    self.folders.pop(wd, None)  # the folder was deleted
+                elif wd in self.folders and (name.endswith('.pdf') or mask & IN_DELETE_SELF):
+                    changed.add(self.folders[wd])
+
+    def close(self):
+        os.close(self.fd)
+
+class PollingWatcher:
+    """Reports the standards whose folder changed by comparing periodic scans of PDF sizes and mtimes.
+
+    A change is only reported once two consecutive scans agree, so a file that is still being
+    copied is not parsed half-written.
+    """
+
+    def __init__(self, pdf_root, standards, poll_interval=DEFAULT_POLL_INTERVAL):
+        self.pdf_root = pdf_root
+        self.standards = standards
+        self.poll_interval = poll_interval
+        self.reported = {standard: self.snapshot(standard) for standard in standards}
+        self.last_seen = dict(self.reported)
+
+    def snapshot(self, standard):
+        """Name -> (size, mtime) of the PDFs in a standard's folder."""
+        try:
+            with os.scandir(os.path.join(self.pdf_root, standard)) as entries:
+                return {entry.name: (entry.stat().st_size, entry.stat().st_mtime_ns)
+                        for entry in entries if entry.name.endswith('.pdf')}
+        except OSError:
+            return {}
+
+    def wait(self, timeout, stop_event):
+        """Block until a folder changes, the timeout expires or stop_event is set; return the changed standards."""
+        deadline = time.monotonic() + timeout
+        while not stop_event.wait(min(self.poll_interval, max(deadline - time.monotonic(), 0))):
+            changed = set()
+            for standard in self.standards:
+                current = self.snapshot(standard)
+                if current == self.last_seen[standard] and current != self.reported[standard]:
+                    self.reported[standard] = current
+                    changed.add(standard)
+                self.last_seen[standard] = current
+            if changed:
+                return changed
+            if time.monotonic() >= deadline:
+                break
+        return set()
+
+    def close(self):
+        pass
+
+def open_watcher(pdf_root, standards, poll=False, poll_interval=DEFAULT_POLL_INTERVAL):
+    """Watch with inotify when available, otherwise fall back to polling."""
+    if not poll:
+        try:
+            return InotifyWatcher(pdf_root, standards)
+        except (OSError, AttributeError) as e:
+            logging.warning(f"inotify is not available ({e}), polling every {poll_interval}s instead")
+    return PollingWatcher(pdf_root, standards, poll_interval)
+
+def start_worker(level, match_window=None):
+    """Pool initializer: set up logging and compile the patterns before the first file arrives."""
+    # The daemon shuts its workers down itself, after the files in progress are written
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    parsing_engine.configure_worker_logging(level)
+    for standard in parsing_engine.STANDARDS:
+        parsing_engine.get_compiled_standard(standard, match_window)
+
+def worker_ready(_):
+    return os.getpid()
+
+def run(standards=None, pdf_root="pdf_files_to_parse", output_directory="output_files", workers=None,
+        poll=False, poll_interval=DEFAULT_POLL_INTERVAL, rescan_interval=DEFAULT_RESCAN_INTERVAL,
+        full=False, stop_event=None, detect_options=None, **options):
+    """Parse the PDFs already waiting, then every PDF that lands, until SIGTERM/SIGINT or stop_event.
+
+    standards can include standard_detector.AUTO, whose PDFs are routed with detect_options.
+    full=True reparses every file in the first pass. Other keyword options (split_pages,
+    match_window, cache_dir, ...) are passed on to directory_runs.process_directory(), which only
+    parses new or changed files.
+    """
+    standards = list(standards or parsing_engine.STANDARDS)
+    if not os.path.isdir(pdf_root):
+        logging.error(f"Directory not found: {pdf_root}")
+        return
+    os.makedirs(output_directory, exist_ok=True)
+    if stop_event is None:
+        stop_event = threading.Event()
+        for signal_number in (signal.SIGTERM, signal.SIGINT):
+            signal.signal(signal_number, lambda signum, frame: stop_event.set())
+
+    workers = workers or os.cpu_count() or 1
+    level = logging.getLogger().level
+    with ProcessPoolExecutor(max_workers=workers, initializer=start_worker,
+                             initargs=(level, options.get("match_window"))) as executor:
+        # Start every worker now, so the first upload does not pay for process start-up
+        list(executor.map(worker_ready, range(workers)))
+        watcher = open_watcher(pdf_root, standards, poll, poll_interval)
+        logging.info(f"Watching {pdf_root} for {', '.join(standards)} with {workers} worker processes "
+                     f"({'inotify' if isinstance(watcher, InotifyWatcher) else 'polling'})")
+        try:
+            changed = set(standards)  # catch up with files that arrived while the daemon was down
+            pass_options = dict(options, full=full)  # --full only applies to the catch-up pass
+            while not stop_event.is_set():
+                if standard_detector.AUTO in changed and os.path.isdir(os.path.join(pdf_root, standard_detector.AUTO)):
+                    detections = standard_detector.route_folder(None, pdf_root, workers, executor, **(detect_options or {}))
+                    changed |= {standard for detection in detections.values() for standard in detection["standards"]}
+                for standard in standards:
+                    if standard in changed and standard != standard_detector.AUTO:
+                        parse_folder(standard, pdf_root, output_directory, workers, executor, pass_options)
+                pass_options = options
+                changed = watcher.wait(rescan_interval, stop_event) or set(standards)
+        finally:
+            watcher.close()
+    logging.info("Watch daemon stopped")
+
+def parse_folder(standard, pdf_root, output_directory, workers, executor, options):
+    pdf_directory = os.path.join(pdf_root, standard)
+    if not os.path.isdir(pdf_directory):
+        return
+    if not any(name.endswith('.pdf') for name in os.listdir(pdf_directory)):
+        # Nothing to parse; only clean up if earlier runs left summaries behind
+        output_format = options.get("output_format", "txt")
+        standard_output = parsing_engine.standard_output_directory(output_directory, standard, output_format)
+        manifest_file = file_manifest.manifest_path(standard_output, standard, pdf_directory)
+        variant = parsing_engine.summary_variant(standard, options.get("match_window"), output_format,
+                                                 options.get("max_matches_per_step"),
+                                                 parsing_engine.profile_for(standard, options.get("extraction_profile")))
+        if not file_manifest.load_manifest(manifest_file, variant):
+            return
+    started = time.monotonic()
+    results = directory_runs.process_directory(standard, pdf_directory, output_directory, workers=workers,
+                                               executor=executor, **options)
+    for pdf_file, result in results.items():
+        if result["status"] == "success":
+            logging.info(f"Successfully parsed {pdf_file}, output written to {result['output']}")
+        elif result["status"] != "unchanged":
+            logging.error(f"Error occurred while parsing {pdf_file} for {standard}: {result['error']}")
+    parsed = sum(1 for result in results.values() if result["status"] != "unchanged")
+    if parsed:
+        logging.info(f"Processed {parsed} PDF files for form type {standard} in {time.monotonic() - started:.2f}s")
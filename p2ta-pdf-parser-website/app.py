@@ -1,20 +1,58 @@
+import io
 import os
 import time
+import hashlib
 import subprocess
 import logging
-from flask import Flask, render_template, request, redirect, url_for, send_from_directory, flash
+import threading
+import multiprocessing
+from flask import Flask, Request, render_template, request, redirect, url_for, send_from_directory, flash, jsonify
+from werkzeug.exceptions import RequestEntityTooLarge
+from werkzeug.utils import secure_filename
 import clamd  # For communicating with the ClamAV daemon
-import PyPDF2  # For verifying the file is a valid PDF
 import shutil  # For creating isolated temp directories
+import job_queue  # Background parsing jobs with state kept in SQLite
+import parser_pool  # Warm parser worker processes
 
 app = Flask(__name__)
 app.secret_key = 'supersecretkey'  # For flash messaging
 
 # Update UPLOAD_FOLDER logic
 UPLOAD_FOLDER = '/app/pdf_files_to_parse'
+STAGING_FOLDER = os.path.join(UPLOAD_FOLDER, '.staging')  # not watched by the parser service's --watch daemon
 OUTPUT_FOLDER = '/app/output_files'
+JOBS_DATABASE = os.environ.get('P2TA_JOBS_DATABASE', '/app/jobs/jobs.sqlite3')
+JOB_WORKERS = int(os.environ.get('P2TA_JOB_WORKERS', job_queue.DEFAULT_WORKERS))
+MAX_PENDING_JOBS = int(os.environ.get('P2TA_MAX_PENDING_JOBS', job_queue.DEFAULT_MAX_PENDING))
+WORKER_MAX_JOBS = int(os.environ.get('P2TA_WORKER_MAX_JOBS', parser_pool.DEFAULT_MAX_JOBS_PER_WORKER))
+PARSE_TIMEOUT = int(os.environ.get('P2TA_PARSE_TIMEOUT', parser_pool.DEFAULT_TIMEOUT))
+VALIDATION_TIMEOUT = float(os.environ.get('P2TA_VALIDATION_TIMEOUT', parser_pool.pdf_validation.DEFAULT_TIME_LIMIT))
+MAX_UPLOAD_MB = int(os.environ.get('P2TA_MAX_UPLOAD_MB', 100))
 ALLOWED_EXTENSIONS = {'pdf'}
 app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
+app.config['MAX_CONTENT_LENGTH'] = MAX_UPLOAD_MB * 1024 * 1024  # Refuse larger requests before reading them
+
+class UploadBuffer(io.BytesIO):
+    """Where an uploaded file is written as the request body is parsed: kept in memory and hashed on the way.
+
+    The bytes are then scanned, parsed and saved from this one buffer, without reading the file back.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.digest = hashlib.sha256()
+
+    def write(self, data):
+        if self.tell() + len(data) > MAX_UPLOAD_MB * 1024 * 1024:
+            raise RequestEntityTooLarge()  # a chunked request whose size was not announced
+        self.digest.update(data)
+        return super().write(data)
+
+class UploadRequest(Request):
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        return UploadBuffer()
+
+app.request_class = UploadRequest
 
 logging.basicConfig(level=logging.INFO)
 
@@ -60,49 +98,28 @@ def connect_to_clamav():
 
 clamav_client = connect_to_clamav()  # Try to establish connection at app startup
 
-# New function to get parser script based on selected form type
-def get_parser_script(form_type):
-    parsers = {
-        "asc606": "p2ta-pdf-parser-app/asc606-pdf-parser.py",
-        "asc842": "p2ta-pdf-parser-app/asc842-pdf-parser.py",
-        "asc805": "p2ta-pdf-parser-app/asc805-pdf-parser.py",
-        "asc718": "p2ta-pdf-parser-app/asc718-pdf-parser.py",
-        "asc815": "p2ta-pdf-parser-app/asc815-pdf-parser.py",
-        "ifrs15": "p2ta-pdf-parser-app/ifrs15-pdf-parser.py",
-        "asc450": "p2ta-pdf-parser-app/asc450-pdf-parser.py",
-        "asc320": "p2ta-pdf-parser-app/asc320-pdf-parser.py",
-        "asc330": "p2ta-pdf-parser-app/asc330-pdf-parser.py",
-        "asc250": "p2ta-pdf-parser-app/asc250-pdf-parser.py",
-    }
-    return parsers.get(form_type)  # Return just the relative path to each parser
+# Function to check the selected form type against the standards the parsing engine knows
+def is_known_form_type(form_type):
+    return form_type in parser_pool.parsing_engine.STANDARDS
 
 # Function to check if file extension is allowed
 def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
-# Function to check if a file is a valid PDF
-def is_valid_pdf(file_path):
-    try:
-        with open(file_path, 'rb') as file:
-            pdf_reader = PyPDF2.PdfReader(file)
-            return len(pdf_reader.pages) > 0
-    except (PyPDF2.errors.PdfReadError, FileNotFoundError, IsADirectoryError):
-        return False
-
-# Function to scan file with ClamAV if available
-def scan_with_clamav(file_path):
-    clamav_scan_path = file_path.replace('/app/pdf_files_to_parse', '/scan')
+# Function to scan an uploaded file's bytes with ClamAV if available
+def scan_with_clamav(data):
     if clamav_client:  # Only scan if ClamAV is available
         try:
-            result = clamav_client.scan(clamav_scan_path)
+            # Stream the bytes to clamd instead of having it read the saved file back from disk
+            result = clamav_client.instream(io.BytesIO(data))
             logging.info(f"ClamAV scan result: {result}")
             
             if result is None:
                 logging.warning("ClamAV scan returned None. Skipping scan.")
                 return True  # Assume clean if no scan result
 
-            # Match ClamAV response format by using clamav_scan_path as the key
-            scan_result = result.get(clamav_scan_path)
+            # clamd reports a scanned stream under the name "stream"
+            scan_result = result.get('stream')
             return scan_result and scan_result[0] == 'OK'
         except Exception as e:
             logging.error(f"ClamAV scan failed: {e}")
@@ -117,6 +134,98 @@ def get_form_folder(form_type):
     os.makedirs(form_folder, exist_ok=True)
     return form_folder
 
+def get_staging_folder(form_type):
+    """Where uploads wait until they are scanned, checked and parsed; only then are they moved into the form folder."""
+    staging_folder = os.path.join(STAGING_FOLDER, form_type)
+    os.makedirs(staging_folder, exist_ok=True)
+    return staging_folder
+
+def upload_name(filename):
+    """The name an upload is saved under: the client's file name, made safe for a path."""
+    return secure_filename(filename) or "upload.pdf"
+
+def discard(file_path):
+    """Remove an upload that will not be moved into its form folder."""
+    try:
+        os.remove(file_path)
+    except FileNotFoundError:
+        pass
+
+def read_upload(file_path):
+    """The payload of a job that waited in the queue or was resumed after a restart, read once from its saved upload."""
+    with open(file_path, 'rb') as pdf_file:
+        data = pdf_file.read()
+    return {"data": data, "sha256": hashlib.sha256(data).hexdigest()}
+
+def parse_upload(job):
+    """Job function: scan an uploaded PDF, then validate and parse it on a warm parser worker.
+
+    Runs on a job queue worker thread; returns the path of the summary in OUTPUT_FOLDER. When the job
+    started at once, its payload holds the upload's bytes and SHA-256, so the saved file is not read again.
+    """
+    file_path = job["pdf_path"]
+    try:
+        payload = job["payload"] or read_upload(file_path)
+    except OSError:
+        raise job_queue.JobFailed("The uploaded file is no longer available.")
+
+    # Scan the uploaded file with ClamAV daemon for viruses, if available
+    if not scan_with_clamav(payload["data"]):
+        discard(file_path)  # Remove file if it's infected
+        raise job_queue.JobFailed("File contains a virus or could not be scanned!")
+
+    # Check that the bytes are a valid PDF and parse only this upload with its form type's rules,
+    # from the same opened document; a parsed upload is moved from staging into its form folder
+    # under the name it was uploaded with (numbered if another upload already has it)
+    try:
+        result = parsers.parse(file_path, job["form_type"], OUTPUT_FOLDER, get_form_folder(job["form_type"]),
+                               payload["data"], payload["sha256"], upload_name(job["filename"]))
+    except multiprocessing.TimeoutError:
+        logging.error(f"Parser timed out after {PARSE_TIMEOUT}s: {file_path}")
+        discard(file_path)
+        raise job_queue.JobFailed("Parser timed out.")
+    if result["status"] != "success":
+        discard(file_path)
+    if result["status"] == "invalid":
+        logging.error(f"Invalid PDF {file_path}: {result['error']}")
+        raise job_queue.JobFailed("Invalid or corrupted PDF file")
+    if result["status"] == "skipped":
+        raise job_queue.JobFailed("No text could be extracted from the PDF.")
+    if result["status"] != "success":
+        logging.error(f"Parser failed: {result['error']}")
+        raise job_queue.JobFailed("Parser failed.")
+    return os.path.relpath(result["output"], OUTPUT_FOLDER)  # <form_type>/<name>.txt
+
+jobs = None  # the job queue, opened at startup (or on first use under another server)
+parsers = None  # the parser worker pool, started with the job queue
+jobs_lock = threading.Lock()
+
+def get_job_queue():
+    """Start the parser workers and open the job queue (resuming unfinished jobs) in the process that serves requests.
+
+    Called at startup; requests call it too, for servers that import the app without running it as a script.
+    """
+    global jobs, parsers
+    with jobs_lock:
+        if jobs is None:
+            parsers = parser_pool.ParserPool(JOB_WORKERS, max_jobs_per_worker=WORKER_MAX_JOBS, timeout=PARSE_TIMEOUT,
+                                             validation_time_limit=VALIDATION_TIMEOUT)
+            jobs = job_queue.JobQueue(JOBS_DATABASE, parse_upload, workers=JOB_WORKERS, max_pending=MAX_PENDING_JOBS)
+    return jobs
+
+def job_status(job):
+    """The JSON view of a job for API clients."""
+    status = {key: job[key] for key in ("status", "form_type", "filename", "error", "created", "started", "finished")}
+    status["job_id"] = job["id"]
+    status["status_url"] = url_for('status', job_id=job["id"])
+    if job["status"] == job_queue.DONE:
+        status["result_url"] = url_for('result', job_id=job["id"])
+    return status
+
+def wants_json():
+    """True for API clients that ask for JSON rather than the HTML page."""
+    return request.accept_mimetypes.best_match(['text/html', 'application/json']) == 'application/json'
+
 @app.route('/')
 def index():
     return render_template('index.html')
@@ -124,56 +233,83 @@ def index():
 @app.route('/upload', methods=['POST'])
 def upload_file():
     if 'file' not in request.files:
-        return render_template('index.html', error_message="No file part in the request")
+        return upload_error("No file part in the request")
 
     file = request.files['file']
-    form_type = request.form['form_type']  # Get the selected form type
+    form_type = request.form.get('form_type')  # Get the selected form type
 
     if file.filename == '':
-        return render_template('index.html', error_message="No selected file")
+        return upload_error("No selected file")
+
+    if not is_known_form_type(form_type):
+        return upload_error("Unknown form type")
 
     if file and allowed_file(file.filename):
-        # Save the uploaded file directly to `pdf_files_to_parse`
-        form_folder = get_form_folder(form_type)
-        file_path = os.path.join(form_folder, file.filename)
-        file.save(file_path)
+        # Save the uploaded file to its staging folder, from the buffer it was received into
+        # (getvalue() hands over the buffer's bytes without copying them, as nothing else holds the buffer),
+        # under a name of its own job, so uploads of the same name do not overwrite each other there or in
+        # OUTPUT_FOLDER, where the summary is named after it
+        data = file.stream.getvalue()
+        job_id = job_queue.new_job_id()
+        file_path = os.path.join(get_staging_folder(form_type), f"{job_id}-{upload_name(file.filename)}")
+        with open(file_path, 'wb') as pdf_file:
+            pdf_file.write(data)
 
         # Set file permissions
         os.chmod(file_path, 0o644)
 
-        # Scan the uploaded file with ClamAV daemon for viruses, if available
-        if not scan_with_clamav(file_path):
-            os.remove(file_path)  # Remove file if it's infected
-            return render_template('index.html', error_message="File contains a virus or could not be scanned!")
-
-        # Check if the file is a valid PDF
-        if not is_valid_pdf(file_path):
-            os.remove(file_path)  # Remove invalid file
-            return render_template('index.html', error_message="Invalid or corrupted PDF file")
-
-        # Route to the appropriate parser script
-        parser_script = get_parser_script(form_type)
-        if parser_script:
-            try:
-                if parser_script == "p2ta-pdf-parser.py":
-                    subprocess.run(['python3', parser_script, '--form_type', form_type], check=True)
-                else:
-                    subprocess.run(['python3', parser_script], check=True)
-            except subprocess.CalledProcessError as e:
-                logging.error(f"Parser failed: {e}")
-                return render_template('index.html', error_message="Parser failed.")
-
-         # Output the result file and display success message
-        output_file = f"{os.path.splitext(file.filename)[0]}.txt"
-        success_message = "No viruses found. Parsing PDF..."
-        return render_template('index.html', output_file=output_file, success_message=success_message)
+        # Scanning, validation and parsing run in the background on the same bytes, if the job starts at once
+        # (the queue drops the payload of a job that has to wait); the client follows the job
+        payload = {"data": data, "sha256": file.stream.digest.hexdigest()}
+        try:
+            get_job_queue().submit(form_type, file.filename, file_path, payload, job_id)
+        except job_queue.QueueFull as e:
+            logging.warning(f"Refusing upload of {file.filename}: {e}")
+            discard(file_path)
+            return upload_error("Too many uploads are being parsed. Please try again later.", 503)
+        if wants_json():
+            return jsonify(job_status(get_job_queue().get(job_id))), 202
+        return render_template('index.html', job_id=job_id, success_message="Upload received. Parsing PDF..."), 202
     else:
-        return render_template('index.html', error_message="File type not allowed. Only PDF files are accepted.")
+        return upload_error("File type not allowed. Only PDF files are accepted.")
+
+@app.errorhandler(RequestEntityTooLarge)
+def upload_too_large(e):
+    return upload_error(f"File is too large. The limit is {MAX_UPLOAD_MB} MB.", 413)
+
+def upload_error(message, status_code=400):
+    if wants_json():
+        return jsonify({"error": message}), status_code
+    return render_template('index.html', error_message=message), status_code
+
+@app.route('/status/<job_id>')
+def status(job_id):
+    job = get_job_queue().get(job_id)
+    if job is None:
+        return jsonify({"error": "Unknown job"}), 404
+    return jsonify(job_status(job))
+
+@app.route('/result/<job_id>')
+def result(job_id):
+    job = get_job_queue().get(job_id)
+    if job is None:
+        return jsonify({"error": "Unknown job"}), 404
+    if job["status"] == job_queue.FAILED:
+        return jsonify(job_status(job)), 422
+    if job["status"] != job_queue.DONE:
+        return jsonify(job_status(job)), 202  # not finished yet; poll /status/<job_id>
+    return send_from_directory(OUTPUT_FOLDER, job["output_file"], as_attachment=True,
+                               download_name=f"{os.path.splitext(upload_name(job['filename']))[0]}.txt")
 
 
-@app.route('/download/<filename>')
+@app.route('/download/<path:filename>')
 def download_file(filename):
     return send_from_directory(OUTPUT_FOLDER, filename, as_attachment=True)
 
 if __name__ == '__main__':
-    app.run(debug=True, host='0.0.0.0')
\ No newline at end of file
+    debug = True
+    # With the debugger on, Flask's reloader serves requests from a child process (WERKZEUG_RUN_MAIN is set
+    # there) while the parent only watches the source files: only the serving process runs jobs
+    if not debug or os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        get_job_queue()  # resume the jobs that were interrupted by the last stop now, not on the first request
+    app.run(debug=debug, host='0.0.0.0')
\ No newline at end of file
@@ -0,0 +1,128 @@
+import os
+import time
+import uuid
+import sqlite3
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+# Background parsing jobs for the website. /upload only saves the PDF and enqueues a job, so the
+# request returns at once whatever the size of the document; a bounded pool of worker threads runs
+# the jobs and clients follow them through /status/<job_id> and /result/<job_id>.
+#
+# Jobs are kept in a SQLite database, so their state survives a restart of the service: finished
+# jobs keep their result, and jobs that were queued or running when the service stopped are run
+# again when the queue is opened.
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+DEFAULT_WORKERS = 2
+DEFAULT_MAX_PENDING = 100  # queued and running jobs; further uploads are refused until some finish
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    form_type TEXT NOT NULL,
+    filename TEXT NOT NULL,
+    pdf_path TEXT NOT NULL,
+    status TEXT NOT NULL,
+    output_file TEXT,
+    error TEXT,
+    created REAL NOT NULL,
+    started REAL,
+    finished REAL
+)
+"""
+COLUMNS = ("id", "form_type", "filename", "pdf_path", "status", "output_file", "error", "created", "started", "finished")
+
+def new_job_id():
+    return uuid.uuid4().hex
+
+class QueueFull(Exception):
+    """Raised by submit() when max_pending jobs are already waiting or running."""
+
+class JobFailed(Exception):
+    """Raised by a job function with the message to show to the user."""
+
+class JobQueue:
+    """Run job_function(job) for every submitted upload on a pool of worker threads.
+
+    job_function receives the job as a dict and returns the path of its output file; it raises
+    JobFailed with a message for the user, any other exception is logged and reported as a
+    generic failure. The job's "payload" is what was given to submit(), kept in memory only and only
+    if a worker was free to start the job at once: it is None for jobs that had to wait in the queue,
+    so queued jobs do not hold e.g. whole uploads in memory, and for jobs resumed after a restart.
+    """
+
+    def __init__(self, database_path, job_function, workers=DEFAULT_WORKERS, max_pending=DEFAULT_MAX_PENDING):
+        os.makedirs(os.path.dirname(os.path.abspath(database_path)), exist_ok=True)
+        self.job_function = job_function
+        self.workers = workers
+        self.max_pending = max_pending
+        self.lock = threading.Lock()
+        # One connection shared by the request and worker threads, serialized by the lock
+        self.connection = sqlite3.connect(database_path, check_same_thread=False, isolation_level=None)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute(SCHEMA)
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="p2ta-job")
+        self.payloads = {}  # job ID -> payload of a job that starts at once
+        self.resume()
+
+    def execute(self, statement, parameters=()):
+        with self.lock:
+            return self.connection.execute(statement, parameters).fetchall()
+
+    def submit(self, form_type, filename, pdf_path, payload=None, job_id=None):
+        """Record a new job and queue it; return its ID (job_id, if the caller picked it with new_job_id())."""
+        job_id = job_id or new_job_id()
+        with self.lock:
+            pending = self.connection.execute("SELECT COUNT(*) FROM jobs WHERE status IN (?, ?)",
+                                              (QUEUED, RUNNING)).fetchone()[0]
+            if pending >= self.max_pending:
+                raise QueueFull(f"{pending} jobs are already waiting")
+            self.connection.execute("INSERT INTO jobs (id, form_type, filename, pdf_path, status, created) "
+                                    "VALUES (?, ?, ?, ?, ?, ?)", (job_id, form_type, filename, pdf_path, QUEUED, time.time()))
+            if pending < self.workers:
+                self.payloads[job_id] = payload
+        self.executor.submit(self.run, job_id)
+        logging.info(f"Queued job {job_id} for {filename} ({form_type})")
+        return job_id
+
+    def get(self, job_id):
+        """The job as a dict, or None if there is no such job."""
+        rows = self.execute(f"SELECT {', '.join(COLUMNS)} FROM jobs WHERE id = ?", (job_id,))
+        return dict(zip(COLUMNS, rows[0])) if rows else None
+
+    def resume(self):
+        """Queue again the jobs that were queued or running when the service last stopped."""
+        rows = self.execute("SELECT id FROM jobs WHERE status IN (?, ?) ORDER BY created", (QUEUED, RUNNING))
+        if rows:
+            self.execute("UPDATE jobs SET status = ?, started = NULL WHERE status = ?", (QUEUED, RUNNING))
+            logging.info(f"Resuming {len(rows)} unfinished jobs")
+        for (job_id,) in rows:
+            self.executor.submit(self.run, job_id)
+
+    def run(self, job_id):
+        """Worker thread: run one job and record its outcome."""
+        self.execute("UPDATE jobs SET status = ?, started = ? WHERE id = ?", (RUNNING, time.time(), job_id))
+        job = self.get(job_id)
+        with self.lock:
+            job["payload"] = self.payloads.pop(job_id, None)
+        try:
+            output_file = self.job_function(job)
+        except JobFailed as e:
+            logging.error(f"Job {job_id} for {job['filename']} failed: {e}")
+            self.finish(job_id, FAILED, error=str(e))
+        except Exception as e:
+            logging.exception(f"Job {job_id} for {job['filename']} failed: {e}")
+            self.finish(job_id, FAILED, error="Parser failed.")
+        else:
+            logging.info(f"Job {job_id} for {job['filename']} finished: {output_file}")
+            self.finish(job_id, DONE, output_file=output_file)
+
+    def finish(self, job_id, status, output_file=None, error=None):
+        self.execute("UPDATE jobs SET status = ?, output_file = ?, error = ?, finished = ? WHERE id = ?",
+                     (status, output_file, error, time.time(), job_id))
@@ -0,0 +1,162 @@
+import os
+import sys
+import queue
+import signal
+import logging
+import multiprocessing
+
+# Make the parser application's modules importable (mounted next to the website in /app)
+PARSER_APP_DIRECTORY = os.environ.get('P2TA_PARSER_APP', 'p2ta-pdf-parser-app')
+sys.path.insert(0, os.path.abspath(PARSER_APP_DIRECTORY))
+
+import parsing_engine  # noqa: E402  Loads PyMuPDF and compiles every standard's patterns, once
+import directory_runs  # noqa: E402
+import pdf_validation  # noqa: E402
+
+# Warm parser processes for the website. Starting `python3 <standard>-pdf-parser.py` for every
+# upload paid for a new interpreter, the PyMuPDF import, argparse and logging setup and the pattern
+# compilation before the first page was read; for a typical 5-20 page contract that was most of
+# the time. Instead, the web server imports parsing_engine once and forks a fixed set of workers,
+# each taking one job at a time through its own pipe. A worker is replaced after max_jobs_per_worker
+# jobs, and since replacements are forked from the same warm server process, they start ready too.
+# A job that runs past the timeout has its worker killed and replaced, so a PDF that hangs the
+# parser does not hold a worker (and every later job) hostage. The PDF check gets its own, shorter
+# limit the same way: the worker reports when the check is done, and is killed if that report is
+# late, since a stalled PyMuPDF open cannot be interrupted from inside the process.
+
+DEFAULT_MAX_JOBS_PER_WORKER = 50
+DEFAULT_TIMEOUT = 600  # seconds to wait for one parse
+CHECKED = "checked"  # sent by a worker once the PDF has passed its check and parsing starts
+
+def start_worker():
+    """Worker initializer: leave Ctrl+C to the web server, which shuts the pool down."""
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+def serve(connection):
+    """Worker process: run parse_file() for every task received on the pipe, until it receives None."""
+    start_worker()
+    while True:
+        try:
+            task = connection.recv()
+        except EOFError:
+            return
+        if task is None:
+            return
+        try:
+            result = parse_file(*task, checked=lambda: connection.send(CHECKED))
+        except Exception as e:
+            logging.exception(f"Parser worker failed on {task[0]}: {e}")
+            result = {"status": "failed", "output": None, "error": str(e)}
+        connection.send(result)
+
+def parse_file(pdf_path, standard, output_directory, pdf_directory, pdf_bytes=None, sha256=None, file_name=None,
+               checked=None):
+    """Worker task: check and parse one uploaded PDF; return its status dict (see parsing_engine.process_pdf()).
+
+    With pdf_bytes, the document is opened from memory once, and the same open document is checked
+    and extracted. A document that fails pdf_validation's checks gets the status "invalid".
+    pdf_path is the upload in its staging folder: once parsed, it is moved into pdf_directory as
+    file_name (default: its own name), or as a numbered variant of it if that name is taken.
+    checked() is called once the document has passed the checks, before it is parsed.
+    """
+    doc, problem = pdf_validation.open_checked(pdf_path, pdf_bytes)
+    if problem:
+        return {"status": "invalid", "output": None, "error": problem}
+    if checked:
+        checked()
+    with doc:
+        results = directory_runs.process_files(standard, [pdf_path], output_directory, pdf_directory=pdf_directory,
+                                               digests={pdf_path: sha256} if sha256 else None, workers=1,
+                                               pdf_document=doc,
+                                               move_parsed={pdf_path: file_name or os.path.basename(pdf_path)})
+    return results[os.path.basename(pdf_path)]
+
+class Worker:
+    """One parser process and the pipe its jobs go through."""
+
+    def __init__(self, context):
+        self.connection, worker_connection = context.Pipe()
+        self.process = context.Process(target=serve, args=(worker_connection,), daemon=True)
+        self.process.start()
+        worker_connection.close()
+        self.jobs = 0
+
+    def stop(self):
+        """Let an idle worker exit. (Closing the pipe is not enough: later forks hold copies of its end.)"""
+        self.connection.send(None)
+        self.process.join()
+        self.connection.close()
+
+    def kill(self):
+        self.process.kill()
+        self.process.join()
+        self.connection.close()
+
+class ParserPool:
+    """A fixed number of parser processes forked from the web server, recycled after a number of jobs."""
+
+    def __init__(self, workers, max_jobs_per_worker=DEFAULT_MAX_JOBS_PER_WORKER, timeout=DEFAULT_TIMEOUT,
+                 validation_time_limit=pdf_validation.DEFAULT_TIME_LIMIT):
+        # fork, so that workers inherit the loaded modules instead of importing the web app again
+        self.context = multiprocessing.get_context("fork")
+        self.idle = queue.Queue()
+        self.workers = [Worker(self.context) for _ in range(workers)]
+        for worker in self.workers:
+            self.idle.put(worker)
+        self.max_jobs_per_worker = max_jobs_per_worker
+        self.timeout = timeout
+        self.validation_time_limit = validation_time_limit
+
+    def replace(self, worker, kill=False):
+        """A fresh worker in place of one that was killed or has run its share of jobs."""
+        if kill:
+            worker.kill()
+        else:
+            worker.stop()
+        replacement = Worker(self.context)
+        self.workers[self.workers.index(worker)] = replacement
+        return replacement
+
+    def parse(self, pdf_path, standard, output_directory, pdf_directory, pdf_bytes=None, sha256=None, file_name=None):
+        """Parse a PDF on an idle worker; raises multiprocessing.TimeoutError if it takes longer than the timeout.
+
+        The worker is killed on timeout, and when it dies during the job (e.g. PyMuPDF crashed), the
+        job is reported as failed; either way a new worker takes its place. A worker that is still
+        checking the PDF after validation_time_limit is killed too, and the PDF reported as invalid.
+        """
+        task = (pdf_path, standard, output_directory, pdf_directory, pdf_bytes, sha256, file_name)
+        worker = self.idle.get()
+        try:
+            if not worker.process.is_alive():
+                worker = self.replace(worker, kill=True)  # it died while idle
+            try:
+                worker.connection.send(task)
+                if not worker.connection.poll(self.validation_time_limit or None):  # 0: no limit
+                    logging.error(f"Killing parser worker {worker.process.pid}: checking {pdf_path} "
+                                  f"took longer than {self.validation_time_limit}s")
+                    worker = self.replace(worker, kill=True)
+                    return {"status": "invalid", "output": None,
+                            "error": f"Checking the PDF took longer than {self.validation_time_limit}s"}
+                result = worker.connection.recv()
+                finished = True
+                if result == CHECKED:
+                    finished = worker.connection.poll(self.timeout)
+                    result = worker.connection.recv() if finished else None
+            except (EOFError, OSError):
+                logging.error(f"Parser worker {worker.process.pid} exited while parsing {pdf_path}")
+                worker = self.replace(worker, kill=True)
+                return {"status": "failed", "output": None, "error": "The parser process exited"}
+            if not finished:
+                logging.error(f"Killing parser worker {worker.process.pid}: {pdf_path} took longer than {self.timeout}s")
+                worker = self.replace(worker, kill=True)
+                raise multiprocessing.TimeoutError(f"Parsing {pdf_path} took longer than {self.timeout}s")
+            worker.jobs += 1
+            if worker.jobs >= self.max_jobs_per_worker:
+                worker = self.replace(worker)
+            return result
+        finally:
+            self.idle.put(worker)
+
+    def close(self):
+        for worker in self.workers:
+            worker.kill()
@@ -4,14 +4,48 @@ document.addEventListener("DOMContentLoaded", function() {
     const dotAnimation = document.getElementById("dot-animation");
     let dots = 0;
 
-    // Show loading message but keep form visible on submit
-    form.addEventListener("submit", function(event) {
+    let animation = null;
+
+    function showLoading() {
         loadingMessage.classList.remove("hidden");  // Show the loading message
 
         // Animate the dots after "Working"
-        setInterval(function() {
+        animation = setInterval(function() {
             dots = (dots + 1) % 4;
             dotAnimation.innerHTML = ".".repeat(dots);  // Add 1 to 3 dots in a repeating loop
         }, 500);  // 500ms interval for the dot animation
-    });
+    }
+
+    function hideLoading() {
+        clearInterval(animation);
+        loadingMessage.classList.add("hidden");
+    }
+
+    // Show loading message but keep form visible on submit
+    form.addEventListener("submit", showLoading);
+
+    // After an upload, poll the parsing job until it is done or failed
+    const job = document.getElementById("job");
+    if (job) {
+        showLoading();
+        const poll = function() {
+            fetch(job.dataset.statusUrl, { headers: { "Accept": "application/json" } })
+                .then(function(response) { return response.json(); })
+                .then(function(status) {
+                    if (status.status === "done") {
+                        hideLoading();
+                        document.getElementById("job-done").classList.remove("hidden");
+                    } else if (status.status === "failed" || status.error) {
+                        hideLoading();
+                        const error = document.getElementById("job-error");
+                        error.textContent = status.error;
+                        error.classList.remove("hidden");
+                    } else {
+                        setTimeout(poll, 1000);
+                    }
+                })
+                .catch(function() { setTimeout(poll, 2000); });
+        };
+        poll();
+    }
 });